@@ -1,3 +1,4 @@
+import argparse
 import sys
 from pathlib import Path
 import matplotlib.pyplot as plt
@@ -13,85 +14,116 @@ sys.path.append(str(SRC_DIR))
 # =====================
 # IMPORTS
 # =====================
-from data_ingestion import (
-    load_births,
-    load_women_15_49,
-    load_fertility_rates,
-)
-from preprocessing import (
-    group_foreigners,
-    compute_mean_annual_population,
-)
-from analysis import (
-    compare_asfr_by_age,
-    compute_tfr_from_rates,
-    mean_age_at_childbearing,
-    build_population_mean_15_49,
-    kitagawa_decomposition,
-    merge_population_and_fertility_rates
+from validation import validate_inputs, has_errors
+from pipeline import (
+    DEFAULT_PARAMS,
+    load_inputs,
+    normalize_inputs,
+    select_inputs,
+    compute_indicators,
 )
+from scenarios import load_config, run_scenarios
+from export import export_results
+from watch import watch
+from data_ingestion import RAW_DATA_DIR, load_monthly_births, resolve_source
+from preprocessing import group_foreigners
+from seasonality import build_monthly_store, decompose_seasonal
+
+
+# =====================
+# ESCENARIOS
+# =====================
+def load_validated_inputs(data_dir=None):
+    """
+    Lee las entradas (por defecto de data/processed) y las valida.
+    """
+    raw = load_inputs(data_dir)
+
+    report = validate_inputs(raw["births"], raw["women"], raw["fertility"], raw["tfr"])
+    print("\n--- VALIDACIÓN DE ENTRADAS ---")
+    print(report[report["severidad"] != "ok"].to_string(index=False))
+    if has_errors(report):
+        raise ValueError("Los datos de entrada no superan la validación")
+
+    return raw
+
+
+def run_batch(config_path, workers=None, export_dir=None, data_dir=None):
+    """
+    Ejecuta todas las variantes definidas en un fichero de configuración
+    y muestra un resumen de los resultados.
+    """
+    raw = load_validated_inputs(data_dir)
+    runs, results = run_scenarios(
+        load_config(config_path), max_workers=workers, raw=raw
+    )
+    if export_dir:
+        export_results(results, export_dir, params=runs, raw=raw)
+
+    print(f"\n=== {len(runs)} ESCENARIOS ===")
+    print(runs)
+
+    print("\n=== KITAGAWA POR ESCENARIO ===")
+    print(results["kitagawa"])
+
+    return runs, results
+
+
+# =====================
+# VIGILANCIA
+# =====================
+def print_summary(cache, stages):
+    """
+    Muestra la tabla sintética anual tras cada recálculo del modo
+    vigilancia.
+    """
+    if "resumen" not in stages:
+        return
+
+    table = cache["resumen"].pivot_table(
+        index="anio",
+        columns="nacionalidad",
+        values=["rate_per_1000", "tfr_calculado", "edad_media_maternidad"]
+    ).round(2)
+
+    print("\n=== TABLA SINTÉTICA ANUAL ===")
+    print(table)
+
 
 # =====================
 # MAIN
 # =====================
-def main():
+def main(params=None, export_dir=None, data_dir=None):
+    params = {**DEFAULT_PARAMS, **(params or {})}
 
     # -----------------
-    # DATA INGESTION
+    # DATA INGESTION Y VALIDACIÓN
     # -----------------
-    births = group_foreigners(load_births())
-    women = group_foreigners(load_women_15_49())
-
-    fertility = load_fertility_rates().rename(
-        columns={"Nacionalidad": "nacionalidad"}
-    )
-    fertility = group_foreigners(fertility)
-
-    women_mean = build_population_mean_15_49(women)
+    raw = load_validated_inputs(data_dir)
 
     # -----------------
-    # RESTRICCIÓN TEMPORAL
+    # NORMALIZACIÓN Y RESTRICCIÓN TEMPORAL / EDADES
     # -----------------
-    births = births[(births["anio"] >= 2002) & (births["anio"] <= 2024)]
-    women_mean = women_mean[(women_mean["anio"] >= 2002) & (women_mean["anio"] <= 2024)]
-    fertility = fertility[(fertility["anio"] >= 2002) & (fertility["anio"] <= 2024)]
-    population_mean_15_49 = build_population_mean_15_49(women)
-
-    population_and_rates_df = merge_population_and_fertility_rates(
-        population_mean_15_49,      # población media por edad y nacionalidad
-        fertility        # tasas ASFR por edad y nacionalidad
-    )
+    inputs = select_inputs(normalize_inputs(raw, params["agrupacion"]), params)
+    fertility = inputs["fertility"]
+
+    results = compute_indicators(inputs, params)
+    if export_dir:
+        export_results(results, export_dir, params=params, raw=raw)
+
     print("\n--- DESCOMPOSICIÓN KITAGAWA ---")
-    print(kitagawa_decomposition(population_and_rates_df, 2010))
-    print(kitagawa_decomposition(population_and_rates_df, 2020))
+    print(results["kitagawa"])
+    print(results["kitagawa_edad"])
 
 
     # =====================
     # BLOQUE A1 — YA EXISTENTE
     # =====================
-    df_rate = births.merge(
-    women_mean.groupby(["anio", "nacionalidad"], as_index=False)
-    ["poblacion"]
-    .sum(),
-    on=["anio", "nacionalidad"],
-)
-
-
-
-    df_rate["rate_per_1000"] = (
-    df_rate["nacimientos"] / df_rate["poblacion"] * 1000
-
-)
-    df_rate["rate_smoothed"] = (
-    df_rate.groupby("nacionalidad")["rate_per_1000"]
-    .transform(lambda x: x.rolling(3, center=True, min_periods=1).mean())
-)
-
-
+    df_rate = results["tasa_nacimientos"]
 
     plt.figure()
     for nat in ["espanola", "extranjera"]:
-        sub = df_rate[df_rate["nacionalidad"] == nat]
+        sub = df_rate[df_rate["nacionalidad"] == nat].sort_values("anio")
         plt.plot(sub["anio"], sub["rate_smoothed"], label=nat)
 
 
@@ -104,17 +136,10 @@ def main():
     # =====================
     # BLOQUE A2 — YA EXISTENTE
     # =====================
-    pivot = df_rate.pivot(
-        index="anio",
-        columns="nacionalidad",
-        values="rate_per_1000",
-    )
-
-    pivot["ratio"] = pivot["extranjera"] / pivot["espanola"]
-    pivot["ratio_smoothed"] = pivot["ratio"].rolling(3, center=True, min_periods=1).mean()
+    pivot = results["ratio_intensidad"]
 
     plt.figure()
-    plt.plot(pivot.index, pivot["ratio_smoothed"])
+    plt.plot(pivot["anio"], pivot["ratio_smoothed"])
 
     plt.axhline(1)
     plt.xlabel("Año")
@@ -125,7 +150,7 @@ def main():
     # =====================
     # BLOQUE B1 — YA EXISTENTE
     # =====================
-    asfr = compare_asfr_by_age(fertility)
+    asfr = results["asfr"]
     latest_year = asfr["anio"].max()
     asfr_latest = asfr[asfr["anio"] == latest_year]
 
@@ -157,7 +182,7 @@ def main():
     # =========================================================
     # 🔹 OPCIONAL 2 — EDAD MEDIA A LA MATERNIDAD (TEMPO)
     # =========================================================
-    mac = mean_age_at_childbearing(fertility)
+    mac = results["edad_media"]
 
     plt.figure()
     for nat in ["espanola", "extranjera"]:
@@ -193,24 +218,36 @@ def main():
         plt.ylabel("Grupo de edad")
         plt.title(f"Heatmap ASFR — {nat}")
         plt.show()
+    # =========================================================
+    # 🔹 OPCIONAL 4 — ESTACIONALIDAD MENSUAL (si hay datos mensuales)
+    # =========================================================
+    monthly_source = resolve_source(
+        data_dir or RAW_DATA_DIR, "births_by_month_and_nationality.csv"
+    )
+    if monthly_source.exists():
+        monthly = build_monthly_store(
+            group_foreigners(load_monthly_births(monthly_source)),
+            group_foreigners(raw["women"]),
+        )
+        # Índices estacionales sin 2020–2021: el COVID queda en el residuo
+        seasonal = decompose_seasonal(monthly, excluir_anios=(2020, 2021))
+
+        plt.figure()
+        for nat in ["espanola", "extranjera"]:
+            sub = seasonal[seasonal["nacionalidad"] == nat]
+            plt.plot(sub["fecha"], sub["residuo"], label=nat)
+        plt.axhline(1)
+        plt.xlabel("Mes")
+        plt.ylabel("Residuo (nacimientos / tendencia × estacionalidad)")
+        plt.title("Nacimientos mensuales — componente irregular")
+        plt.legend()
+        plt.show()
+
     # =====================
     # TABLA PROFESIONAL ANUAL
     # =====================
+    summary_full = results["resumen"]
 
-    # 1️⃣ Tasas agregadas
-    rates = df_rate[["anio", "nacionalidad", "rate_per_1000"]]
-
-    # 2️⃣ TFR anual
-    tfr_df = compute_tfr_from_rates(fertility)
-
-    # 3️⃣ Edad media anual
-    mac_df = mean_age_at_childbearing(fertility)
-
-    # 4️⃣ Merge completo
-    summary_full = rates.merge(tfr_df, on=["anio", "nacionalidad"])
-    summary_full = summary_full.merge(mac_df, on=["anio", "nacionalidad"])
-
-    # 5️⃣ Pivot para vista final
     table_full = summary_full.pivot_table(
         index="anio",
         columns="nacionalidad",
@@ -222,15 +259,7 @@ def main():
     # =====================
     # TABLA FINAL
     # =====================
-    tfr = compute_tfr_from_rates(fertility)
-    years = [2002, 2010, 2015, 2020, 2024]
-
-    summary = df_rate.merge(
-        tfr,
-        on=["anio", "nacionalidad"],
-    )
-
-    summary = summary[summary["anio"].isin(years)]
+    summary = summary_full[summary_full["anio"].isin(params["anios_resumen"])]
 
     table = summary.pivot_table(
         index="anio",
@@ -240,14 +269,46 @@ def main():
 
     print("\n=== TABLA D1 — INDICADORES CLAVE ===")
     print(table)
-    result_2010 = kitagawa_decomposition(population_and_rates_df, 2010)
-    result_2020 = kitagawa_decomposition(population_and_rates_df, 2020)
 
-    print(result_2010)
-    print(result_2020)
+    return results
 
 # =====================
 # RUN
 # =====================
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(
+        description="Estudio de natalidad en España por nacionalidad de la madre"
+    )
+    parser.add_argument(
+        "--config",
+        help="fichero JSON de escenarios; sin él se ejecuta el estudio por defecto",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="procesos para ejecutar los escenarios",
+    )
+    parser.add_argument(
+        "--export",
+        metavar="DIR",
+        help="directorio donde exportar los indicadores en Parquet (requiere pyarrow)",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="vigila data/processed y recalcula solo lo afectado por cada cambio",
+    )
+    parser.add_argument(
+        "--datos",
+        metavar="DIR",
+        help="directorio de datos (por defecto data/processed); cada entrada "
+        "es su fichero .csv o un subdirectorio con ese nombre con particiones",
+    )
+    args = parser.parse_args()
+
+    if args.watch:
+        watch(directory=args.datos, on_update=print_summary)
+    elif args.config:
+        run_batch(args.config, args.workers, args.export, args.datos)
+    else:
+        main(export_dir=args.export, data_dir=args.datos)
@@ -1,12 +1,18 @@
+from preprocessing import compute_mean_annual_population
+
+
 def build_population_mean_15_49(population):
     """
-    Construye la población femenina media anual 15–49
-    a partir de recuentos a 1 enero / 1 julio.
+    Construye la población femenina media anual 15–49 (personas-año)
+    a partir de los cortes de población (1 enero / 1 julio).
+
+    Usa el mismo motor de exposición que compute_mean_annual_population.
 
     Resultado:
     - anio
+    - grupo_edad
     - nacionalidad
-    - poblacion_media_15_49
+    - poblacion
     """
 
     # Nos quedamos SOLO con edades fértiles estándar
@@ -20,29 +26,9 @@ def build_population_mean_15_49(population):
         "De 45 a 49 anios",
     ]
 
-    pop = population[population["grupo_edad"].isin(valid_ages)].copy()
-    pop["anio"] = pop["anio"].str.extract(r"(\d{4})").astype(int)
-
-    # Primero agregamos la población por edad y nacionalidad (sumar categorías)
-    pop_agg = (
-        pop.groupby(["anio", "grupo_edad", "nacionalidad"], as_index=False)
-        ["poblacion"]
-        .sum()
-    )
-
-    # Luego calculamos la media entre enero y julio
-    pop_media = (
-        pop_agg.groupby(["anio", "grupo_edad", "nacionalidad"], as_index=False)
-        ["poblacion"]
-        .mean()
-    )
-    pop_total = (
-    pop_media.groupby(["anio", "nacionalidad"], as_index=False)["poblacion"]
-    .sum()
-    .rename(columns={"poblacion": "poblacion_media_15_49"})
-    )
+    pop = population[population["grupo_edad"].isin(valid_ages)]
 
-    return pop_media
+    return compute_mean_annual_population(pop)
 def birth_rate_per_1000_women(births, population_mean_15_49):
     """
     Calcula la tasa anual de nacimientos por 1.000 mujeres 15–49.
@@ -99,13 +85,18 @@ def merge_population_and_fertility_rates(population, fertility_rates):
     - anio
     - grupo_edad
     - nacionalidad
+    - region (si ambas entradas la tienen)
     - poblacion
     - tasa (por 1.000 mujeres)
     - nacimientos_esperados
     """
+    keys = ["anio", "grupo_edad", "nacionalidad"]
+    if "region" in population.columns and "region" in fertility_rates.columns:
+        keys.append("region")
+
     df = population.merge(
         fertility_rates,
-        on=["anio", "grupo_edad", "nacionalidad"],
+        on=keys,
         how="inner"
     )
 
@@ -113,7 +104,7 @@ def merge_population_and_fertility_rates(population, fertility_rates):
     df["nacimientos_esperados"] = df["poblacion"] * (df["tasa"] / 1000)
 
     return df
-def compute_tfr_from_rates(fertility_rates):
+def compute_tfr_from_rates(fertility_rates, by=("anio", "nacionalidad")):
     """
     Calcula el TFR (Total Fertility Rate) a partir de tasas específicas por edad.
 
@@ -122,9 +113,10 @@ def compute_tfr_from_rates(fertility_rates):
     - Los grupos de edad son quinquenales (amplitud = 5 años).
     - Se cubre el intervalo 15–49.
 
+    by permite añadir claves (p. ej. región) a anio y nacionalidad.
+
     Devuelve un DataFrame con:
-    - anio
-    - nacionalidad
+    - by (anio, nacionalidad)
     - tfr_calculado
     """
     df = fertility_rates.copy()
@@ -136,7 +128,7 @@ def compute_tfr_from_rates(fertility_rates):
     df["contribucion_tfr"] = df["tasa_por_mujer"] * 5
 
     tfr = (
-        df.groupby(["anio", "nacionalidad"], as_index=False)
+        df.groupby(list(by), as_index=False)
         ["contribucion_tfr"]
         .sum()
         .rename(columns={"contribucion_tfr": "tfr_calculado"})
@@ -222,10 +214,11 @@ def compare_asfr_by_age(df):
     df_es = df[df["nacionalidad"] == "espanola"]
     df_ex = df[df["nacionalidad"] == "extranjera"]
 
-    # Unir por año y edad
+    # Unir por año y edad (y región si existe)
+    keys = ["anio", "grupo_edad"] + (["region"] if "region" in df.columns else [])
     m = df_es.merge(
         df_ex,
-        on=["anio", "grupo_edad"],
+        on=keys,
         suffixes=("_es", "_ex")
     )
 
@@ -234,9 +227,8 @@ def compare_asfr_by_age(df):
     m["ratio_extranjera_espanola"] = m["tasa_ex"] / m["tasa_es"]
 
     return m[
-        [
-            "anio",
-            "grupo_edad",
+        keys
+        + [
             "tasa_es",
             "tasa_ex",
             "diferencial_absoluto",
@@ -244,7 +236,7 @@ def compare_asfr_by_age(df):
         ]
     ]
    
-def mean_age_at_childbearing(df):
+def mean_age_at_childbearing(df, by=("anio", "nacionalidad")):
     """
     Calcula la edad media a la maternidad (MAC) por año y nacionalidad
     a partir de tasas específicas de fecundidad por edad.
@@ -258,6 +250,8 @@ def mean_age_at_childbearing(df):
         - nacionalidad
         - tasa (por 1.000 mujeres)
 
+    by : claves de agrupación (por defecto anio y nacionalidad)
+
     """
     d = df.copy()
 
@@ -280,7 +274,7 @@ def mean_age_at_childbearing(df):
 
     # MAC = sum(edad * tasa) / sum(tasa)
     mac = (
-        d.groupby(["anio", "nacionalidad"])
+        d.groupby(list(by))
         .apply(lambda x: (x["edad_central"] * x["tasa"]).sum() / x["tasa"].sum())
         .reset_index(name="edad_media_maternidad")
     )
@@ -322,8 +316,10 @@ def build_pseudo_cohorts(df):
     # Cohorte aproximada
     d["cohorte"] = (d["anio"] - d["edad"]).round().astype(int)
 
+    keys = ["nacionalidad"] + (["region"] if "region" in d.columns else [])
+
     return d[
-        ["cohorte", "edad", "anio", "nacionalidad", "tasa"]
+        ["cohorte", "edad", "anio"] + keys + ["tasa"]
     ]
 def compare_cohorts_by_age(df, cohort_min=None, cohort_max=None):
     """
@@ -0,0 +1,203 @@
+import numpy as np
+import pandas as pd
+from scipy import linalg, sparse
+
+from preprocessing import age_group_bounds
+
+# Restricciones de identificación disponibles
+IDENTIFICATIONS = ("cohortes_iguales", "sin_cohorte", "sin_periodo")
+
+
+def prepare_apc_data(df):
+    """
+    Prepara nacimientos y exposición para el modelo APC a partir de la
+    salida de merge_population_and_fertility_rates.
+
+    El modelo necesita una rejilla de Lexis regular: periodos y cohortes
+    de la misma amplitud que los grupos de edad. Con grupos quinquenales
+    los años se agrupan en periodos de 5 años (sumando nacimientos y
+    exposición); con edades simples se mantienen los años.
+
+    - edad: edad inicial del grupo
+    - periodo: primer año del periodo
+    - cohorte: periodo - edad (primer año de nacimiento de la cohorte)
+
+    Se usan los nacimientos observados si existe la columna 'nacimientos'
+    y, si no, nacimientos_esperados. Se descartan los grupos abiertos
+    ("50 y mas") y las celdas sin exposición.
+    """
+    d = df.copy()
+    if "nacimientos" not in d.columns:
+        d["nacimientos"] = d["nacimientos_esperados"]
+
+    bounds = age_group_bounds(d["grupo_edad"])
+    width = bounds["edad_fin"] - bounds["edad_inicio"] + 1
+    d["edad"] = bounds["edad_inicio"].to_numpy()
+    d = d[np.isfinite(width.to_numpy()) & (d["poblacion"] > 0).to_numpy()]
+
+    step = int(width[np.isfinite(width)].median())
+    first_year = d["anio"].min()
+    d["edad"] = d["edad"].astype(int)
+    d["periodo"] = first_year + (d["anio"] - first_year) // step * step
+    d["cohorte"] = d["periodo"] - d["edad"]
+
+    keys = ["edad", "periodo", "cohorte", "nacionalidad"]
+    if "region" in d.columns:
+        keys.append("region")
+
+    return (
+        d.groupby(keys, as_index=False)[["nacimientos", "poblacion"]]
+        .sum()
+    )
+
+
+def _factor_block(codes, n_levels, dropped, rows_mask=None):
+    """
+    Columnas dummy (dispersas) de un factor, sin los niveles de referencia.
+    Devuelve (filas, columnas, niveles usados).
+    """
+    keep = np.setdiff1d(np.arange(n_levels), dropped)
+    col_of = np.full(n_levels, -1)
+    col_of[keep] = np.arange(len(keep))
+
+    cols = col_of[codes]
+    mask = cols >= 0
+    if rows_mask is not None:
+        mask &= rows_mask
+    rows = np.flatnonzero(mask)
+
+    return rows, cols[mask], keep
+
+
+def build_design(data, identificacion="cohortes_iguales", interaccion=("edad",)):
+    """
+    Matriz de diseño dispersa (CSR) del modelo log-lineal:
+
+        log μ = log E + const + nacionalidad + edad + periodo + cohorte
+                + nacionalidad × (efectos de 'interaccion')
+                [+ región si existe la columna]
+
+    Cada factor toma su primer nivel como referencia. La restricción de
+    identificación resuelve la dependencia cohorte = periodo - edad:
+    - cohortes_iguales: las dos cohortes más antiguas tienen el mismo efecto
+    - sin_cohorte: modelo edad-periodo
+    - sin_periodo: modelo edad-cohorte
+
+    Devuelve la matriz y una tabla con el término de cada columna.
+    """
+    if identificacion not in IDENTIFICATIONS:
+        raise ValueError(f"Identificación desconocida: {identificacion}")
+
+    factors = ["edad", "periodo", "cohorte"]
+    if identificacion == "sin_cohorte":
+        factors.remove("cohorte")
+    if identificacion == "sin_periodo":
+        factors.remove("periodo")
+
+    n = len(data)
+    rows, cols, terms = [np.arange(n)], [np.zeros(n, dtype=int)], [("constante", None, None)]
+
+    def add(term, column, dropped, nat=None, rows_mask=None):
+        codes, levels = pd.factorize(data[column], sort=True)
+        r, c, keep = _factor_block(codes, len(levels), dropped, rows_mask)
+        rows.append(r)
+        cols.append(c + len(terms))
+        terms.extend((term, levels[k], nat) for k in keep)
+
+    nat_codes, nats = pd.factorize(data["nacionalidad"], sort=True)
+    add("nacionalidad", "nacionalidad", [0])
+    if "region" in data.columns:
+        add("region", "region", [0])
+
+    for factor in factors:
+        dropped = [0, 1] if factor == "cohorte" and identificacion == "cohortes_iguales" else [0]
+        add(factor, factor, dropped)
+        if factor in interaccion:
+            for k in range(1, len(nats)):
+                add(factor, factor, dropped, nat=nats[k], rows_mask=nat_codes == k)
+
+    r = np.concatenate(rows)
+    c = np.concatenate(cols)
+    x = sparse.csr_matrix((np.ones(len(r)), (r, c)), shape=(n, len(terms)))
+    terms = pd.DataFrame(terms, columns=["termino", "nivel", "nacionalidad"])
+
+    # Niveles sin observaciones (p. ej. cohortes de una sola nacionalidad)
+    used = np.bincount(c, minlength=len(terms)) > 0
+    x = x[:, np.flatnonzero(used)]
+    terms = terms[used].reset_index(drop=True)
+
+    return x, terms
+
+
+def fit_poisson_irls(x, births, exposure, max_iter=50, tol=1e-8):
+    """
+    Ajusta un GLM de Poisson con enlace log y offset log(exposición) por
+    mínimos cuadrados reponderados (IRLS).
+
+    X es dispersa; en cada iteración solo se forma X'WX (p × p), de modo
+    que la memoria no depende del producto filas × parámetros.
+    """
+    offset = np.log(exposure)
+    beta = np.zeros(x.shape[1])
+    beta[0] = np.log(births.sum() / exposure.sum())
+
+    deviance = np.inf
+    for iteration in range(1, max_iter + 1):
+        eta = x @ beta + offset
+        mu = np.exp(eta)
+        z = eta - offset + (births - mu) / mu
+
+        xtw = x.T.multiply(mu).tocsr()
+        xtwx = (xtw @ x).toarray()
+        beta = linalg.solve(xtwx, xtw @ z, assume_a="pos")
+
+        mu = np.exp(x @ beta + offset)
+        ratio = np.divide(births, mu, out=np.ones_like(mu), where=births > 0)
+        new_deviance = 2 * np.sum(births * np.log(ratio) - (births - mu))
+        if abs(deviance - new_deviance) < tol * (abs(new_deviance) + 1):
+            deviance = new_deviance
+            break
+        deviance = new_deviance
+
+    xtw = x.T.multiply(mu).tocsr()
+    cov = linalg.inv((xtw @ x).toarray())
+
+    return {
+        "beta": beta,
+        "se": np.sqrt(np.diag(cov)),
+        "mu": mu,
+        "devianza": deviance,
+        "iteraciones": iteration,
+    }
+
+
+def fit_apc(df, identificacion="cohortes_iguales", interaccion=("edad",)):
+    """
+    Ajusta un modelo Poisson edad-periodo-cohorte a nacimientos y
+    exposición (salida de merge_population_and_fertility_rates), con
+    interacción de la nacionalidad con los efectos indicados.
+
+    Devuelve un diccionario con:
+    - coeficientes: termino, nivel, nacionalidad, coef, se, rr (= exp(coef))
+    - ajustados: datos con los nacimientos ajustados
+    - devianza, gl (grados de libertad residuales), iteraciones
+    """
+    data = prepare_apc_data(df)
+    x, terms = build_design(data, identificacion, interaccion)
+
+    fit = fit_poisson_irls(
+        x,
+        data["nacimientos"].to_numpy(dtype=float),
+        data["poblacion"].to_numpy(dtype=float),
+    )
+
+    coefs = terms.assign(coef=fit["beta"], se=fit["se"])
+    coefs["rr"] = np.exp(coefs["coef"])
+
+    return {
+        "coeficientes": coefs,
+        "ajustados": data.assign(nacimientos_ajustados=fit["mu"]),
+        "devianza": fit["devianza"],
+        "gl": x.shape[0] - x.shape[1],
+        "iteraciones": fit["iteraciones"],
+    }
@@ -1,9 +1,17 @@
+import glob
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from pathlib import Path
 import pandas as pd
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 RAW_DATA_DIR = BASE_DIR / "data" / "processed"
 
+EXECUTORS = {
+    "thread": ThreadPoolExecutor,
+    "process": ProcessPoolExecutor,
+}
+
 
 def _validate_columns(df, expected_cols, name):
     missing = set(expected_cols) - set(df.columns)
@@ -13,49 +21,167 @@ def _validate_columns(df, expected_cols, name):
         )
 
 
-def load_births():
-    df = pd.read_csv(RAW_DATA_DIR / "births_by_nationality.csv", sep=",")
-    _validate_columns(
-        df,
+def _list_partitions(source, default_name):
+    """
+    Ficheros a leer: el fichero por defecto de RAW_DATA_DIR, un fichero,
+    todos los .csv de un directorio o un patrón glob.
+    """
+    if source is None:
+        return [RAW_DATA_DIR / default_name]
+
+    path = Path(source)
+    if path.is_dir():
+        files = sorted(path.glob("*.csv"))
+    elif path.is_file():
+        files = [path]
+    else:
+        files = sorted(Path(p) for p in glob.glob(str(source)))
+
+    if not files:
+        raise FileNotFoundError(f"{source}: no hay ficheros que leer")
+    return files
+
+
+def resolve_source(directory, default_name):
+    """
+    Fuente de una entrada dentro de un directorio de datos: el
+    subdirectorio con el nombre del fichero (sin .csv) si existe, con
+    una partición por fichero, o el propio fichero.
+    """
+    directory = Path(directory)
+    partitions = directory / Path(default_name).stem
+    return partitions if partitions.is_dir() else directory / default_name
+
+
+def _read_partition(path, expected_cols, name, read_kwargs, rename, partition_col):
+    """
+    Lee, valida y normaliza una partición. Devuelve el DataFrame y los
+    segundos empleados.
+    """
+    start = time.perf_counter()
+
+    df = pd.read_csv(path, **read_kwargs)
+    _validate_columns(df, expected_cols, f"{name} ({Path(path).name})")
+    if rename:
+        df = df.rename(columns=rename)
+    if partition_col:
+        df[partition_col] = Path(path).stem
+
+    return df, time.perf_counter() - start
+
+
+def _load_partitions(
+    source,
+    default_name,
+    expected_cols,
+    name,
+    read_kwargs,
+    rename=None,
+    partition_col=None,
+    max_workers=None,
+    executor="thread",
+    verbose=False,
+):
+    """
+    Lee en paralelo todas las particiones de un mismo esquema (p. ej. un
+    fichero por provincia o por año), valida y normaliza cada una y las
+    concatena una sola vez.
+
+    Los tiempos por fichero quedan en df.attrs["particiones"] (lista de
+    registros fichero, filas, segundos).
+    """
+    files = _list_partitions(source, default_name)
+    args = (expected_cols, name, read_kwargs, rename, partition_col)
+
+    if len(files) == 1:
+        results = [_read_partition(files[0], *args)]
+        if verbose:
+            print(
+                f"[1/1] {files[0].name}: "
+                f"{len(results[0][0])} filas en {results[0][1]:.3f} s"
+            )
+    else:
+        results = [None] * len(files)
+        with EXECUTORS[executor](max_workers=max_workers) as pool:
+            futures = {
+                pool.submit(_read_partition, path, *args): i
+                for i, path in enumerate(files)
+            }
+            for done, future in enumerate(as_completed(futures), start=1):
+                i = futures[future]
+                results[i] = future.result()
+                if verbose:
+                    df, seconds = results[i]
+                    print(
+                        f"[{done}/{len(files)}] {files[i].name}: "
+                        f"{len(df)} filas en {seconds:.3f} s"
+                    )
+
+    df = pd.concat([r[0] for r in results], ignore_index=True)
+    df.attrs["particiones"] = [
+        {"fichero": str(f), "filas": len(r[0]), "segundos": r[1]}
+        for f, r in zip(files, results)
+    ]
+
+    return df
+
+
+def load_births(source=None, **options):
+    return _load_partitions(
+        source,
+        "births_by_nationality.csv",
         ["anio", "nacionalidad", "nacimientos"],
         "births_by_nationality",
+        {"sep": ","},
+        **options,
     )
-    return df
 
 
-def load_women_15_49():
-    df = pd.read_csv(
-    RAW_DATA_DIR / "women_15_49_by_nationality.csv",
-    sep=",",
-    thousands="."
-    )
-    _validate_columns(
-        df,
+def load_women_15_49(source=None, **options):
+    return _load_partitions(
+        source,
+        "women_15_49_by_nationality.csv",
         ["grupo_edad", "nacionalidad", "anio", "poblacion"],
         "women_15_49_by_nationality",
+        {"sep": ",", "thousands": "."},
+        **options,
     )
-    print(df.dtypes)
-
-    return df
 
 
-def load_fertility_rates():
-    df = pd.read_csv(
-        RAW_DATA_DIR / "fertility_rates_by_age_and_nationality.csv", sep=","
-    )
-    _validate_columns(
-        df,
+def load_fertility_rates(source=None, **options):
+    return _load_partitions(
+        source,
+        "fertility_rates_by_age_and_nationality.csv",
         ["grupo_edad", "Nacionalidad", "anio", "tasa"],
         "fertility_rates_by_age_and_nationality",
+        {"sep": ","},
+        # Mismo nombre de columna que el resto de ficheros
+        rename={"Nacionalidad": "nacionalidad"},
+        **options,
     )
-    return df
 
 
-def load_tfr():
-    df = pd.read_csv(RAW_DATA_DIR / "tfr_by_nationality.csv", sep=",")
-    _validate_columns(
-        df,
+def load_monthly_births(source=None, **options):
+    """
+    Nacimientos por mes y nacionalidad de la madre (INE).
+    La columna 'mes' contiene el nombre del mes en español.
+    """
+    return _load_partitions(
+        source,
+        "births_by_month_and_nationality.csv",
+        ["anio", "mes", "nacionalidad", "nacimientos"],
+        "births_by_month_and_nationality",
+        {"sep": ",", "thousands": "."},
+        **options,
+    )
+
+
+def load_tfr(source=None, **options):
+    return _load_partitions(
+        source,
+        "tfr_by_nationality.csv",
         ["anio", "nacionalidad", "tfr"],
         "tfr_by_nationality",
+        {"sep": ","},
+        **options,
     )
-    return df
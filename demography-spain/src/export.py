@@ -0,0 +1,153 @@
+import hashlib
+import json
+import shutil
+from datetime import datetime, timezone
+from pathlib import Path
+import pandas as pd
+
+from data_ingestion import RAW_DATA_DIR
+
+# Columnas de partición, en este orden, si el indicador las tiene
+PARTITION_COLS = ("run_id", "anio", "region")
+
+MANIFEST = "manifest.json"
+
+
+def _file_hash(path, chunk_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def input_hashes(raw=None):
+    """
+    SHA-256 de los ficheros de entrada. Con raw (salida de load_inputs)
+    se usan las particiones registradas por los loaders; sin él, todos
+    los .csv de RAW_DATA_DIR.
+    """
+    if raw is None:
+        files = sorted(RAW_DATA_DIR.glob("*.csv"))
+    else:
+        files = [
+            Path(p["fichero"])
+            for df in raw.values()
+            for p in df.attrs.get("particiones", [])
+        ]
+
+    return {str(f): _file_hash(f) for f in files}
+
+
+def _to_table(df):
+    """
+    Tabla Arrow tipada: índice (p. ej. run_id) como columna y textos
+    como string.
+    """
+    import pyarrow as pa
+
+    d = df.reset_index() if df.index.name else df.reset_index(drop=True)
+    for col in d.columns:
+        if d[col].dtype == object:
+            d[col] = d[col].astype("string")
+
+    return pa.Table.from_pandas(d, preserve_index=False)
+
+
+def export_results(results, out_dir, params=None, raw=None):
+    """
+    Escribe cada indicador como dataset Parquet particionado (estilo hive):
+
+        out_dir/indicador=<nombre>/[run_id=<id>/]anio=<año>/[region=<r>/]*.parquet
+
+    Los indicadores sin año (p. ej. coeficientes APC) se escriben sin
+    partición. Sirve tanto para la salida de compute_indicators como
+    para el almacén de run_scenarios (indexado por run_id).
+
+    Junto a los datos se escribe manifest.json con la fecha, los
+    parámetros de la ejecución, los hashes de las entradas y el esquema,
+    filas y particiones de cada indicador.
+
+    Requiere pyarrow.
+    """
+    import pyarrow.dataset as ds
+
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    # Una exportación sustituye entera a la anterior: sin esto quedarían
+    # particiones viejas (p. ej. run_id=* de un lote) que ya no recoge
+    # el manifiesto
+    for stale in out_dir.glob("indicador=*"):
+        shutil.rmtree(stale)
+
+    indicators = {}
+    for name, df in results.items():
+        table = _to_table(df)
+        partition_cols = [c for c in PARTITION_COLS if c in table.column_names]
+
+        ds.write_dataset(
+            table,
+            out_dir / f"indicador={name}",
+            format="parquet",
+            partitioning=partition_cols or None,
+            partitioning_flavor="hive" if partition_cols else None,
+            existing_data_behavior="overwrite_or_ignore",
+        )
+        indicators[name] = {
+            "filas": table.num_rows,
+            "particiones": partition_cols,
+            "columnas": {f.name: str(f.type) for f in table.schema},
+        }
+
+    if isinstance(params, pd.DataFrame):
+        params = params.reset_index().to_dict(orient="records")
+
+    manifest = {
+        "creado": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "parametros": params,
+        "entradas": input_hashes(raw),
+        "indicadores": indicators,
+    }
+    (out_dir / MANIFEST).write_text(
+        json.dumps(manifest, indent=2, ensure_ascii=False, default=str),
+        encoding="utf-8",
+    )
+
+    return manifest
+
+
+def read_manifest(out_dir):
+    return json.loads((Path(out_dir) / MANIFEST).read_text(encoding="utf-8"))
+
+
+def read_indicator(out_dir, indicador, filters=None, columns=None):
+    """
+    Lee un indicador exportado. filters es una expresión de
+    pyarrow.dataset (p. ej. ds.field("anio") == 2020) que se aplica
+    sobre las particiones, de modo que solo se leen los ficheros
+    necesarios.
+
+    Requiere pyarrow.
+    """
+    import pyarrow.dataset as ds
+
+    path = Path(out_dir) / f"indicador={indicador}"
+    if not path.exists():
+        raise FileNotFoundError(f"{path}: indicador no exportado")
+
+    import pyarrow as pa
+
+    meta = read_manifest(out_dir)["indicadores"][indicador]
+    # Tipos de partición del manifiesto, no los que infiere pyarrow
+    # (que leería anio y run_id como int32)
+    partitioning = None
+    if meta["particiones"]:
+        schema = pa.schema(
+            [(c, pa.type_for_alias(meta["columnas"][c])) for c in meta["particiones"]]
+        )
+        partitioning = ds.partitioning(schema, flavor="hive")
+
+    dataset = ds.dataset(path, format="parquet", partitioning=partitioning)
+
+    return dataset.to_table(filter=filters, columns=columns).to_pandas()
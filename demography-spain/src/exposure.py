@@ -0,0 +1,148 @@
+import numpy as np
+import pandas as pd
+
+# Frecuencias admitidas: año natural o mes natural
+FREQUENCIES = ("YS", "MS")
+
+
+def _interpolate_rows(values, t):
+    """
+    Interpolación lineal en el tiempo, fila a fila y sin bucles, de los
+    huecos (NaN) de una matriz series × instantes.
+
+    Fuera del rango observado de cada serie se mantiene constante el
+    primer / último valor. Las filas sin ningún dato quedan en NaN.
+    """
+    n, k = values.shape
+    valid = ~np.isnan(values)
+    cols = np.arange(k)
+
+    # Índice del último dato válido a la izquierda y del primero a la derecha
+    prev = np.maximum.accumulate(np.where(valid, cols, -1), axis=1)
+    nxt = np.minimum.accumulate(
+        np.where(valid, cols, k)[:, ::-1], axis=1
+    )[:, ::-1]
+
+    has_prev = prev >= 0
+    has_next = nxt < k
+    prev_c = np.where(has_prev, prev, np.where(has_next, nxt, 0))
+    next_c = np.where(has_next, nxt, prev_c)
+
+    rows = np.arange(n)[:, None]
+    v0 = values[rows, prev_c]
+    v1 = values[rows, next_c]
+    t0 = t[prev_c]
+    span = t[next_c] - t0
+    w = np.divide(
+        t[None, :] - t0,
+        span,
+        out=np.zeros(values.shape),
+        where=span > 0,
+    )
+
+    return v0 + (v1 - v0) * w
+
+
+def person_years(
+    df,
+    keys=("grupo_edad", "nacionalidad"),
+    date_col="fecha",
+    value_col="poblacion",
+    freq="YS",
+):
+    """
+    Calcula personas-año de exposición por periodo (año o mes natural)
+    a partir de recuentos de población en fechas de corte arbitrarias.
+
+    Método:
+    - Se suman los recuentos de cada serie (keys) en cada fecha.
+    - Se añaden como nodos los límites de todos los periodos y los
+      cortes que falten se interpolan linealmente en el tiempo.
+    - Se integra por trapecios entre nodos consecutivos. El tiempo se
+      mide en fracción del año natural, de modo que las personas-año
+      de un año equivalen a su población media.
+
+    Para cada serie se calculan todos los periodos de los años naturales
+    entre su primer y su último corte. Los extremos se completan con el
+    primer / último corte (p. ej. julio -> 31 de diciembre cuando aún no
+    existe el 1 de enero siguiente), también con freq="MS": los meses de
+    agosto a diciembre reciben la población del último corte.
+
+    Devuelve un DataFrame con:
+    - keys
+    - inicio (fecha de inicio del periodo)
+    - personas_anio
+    """
+    keys = list(keys)
+    if freq not in FREQUENCIES:
+        raise ValueError(f"Frecuencia no admitida: {freq}")
+
+    wide = (
+        df.dropna(subset=[date_col])
+        .groupby(keys + [date_col])[value_col]
+        .sum()
+        .unstack(date_col)
+        .sort_index(axis=1)
+    )
+    snapshots = pd.DatetimeIndex(wide.columns)
+
+    # Nodos: cortes observados + límites de periodo. El rango cubre años
+    # naturales completos con cualquier frecuencia, de modo que los meses
+    # de un año suman lo mismo que el año
+    first = snapshots.min().to_period("Y").start_time
+    last = snapshots.max().to_period("Y").end_time.normalize() + pd.Timedelta(days=1)
+    bounds = pd.date_range(first, last, freq=freq)
+    knots = snapshots.union(bounds)
+
+    values = wide.reindex(columns=knots).to_numpy(dtype=float)
+    t = (knots - knots[0]).days.to_numpy(dtype=float)
+
+    # Años naturales cubiertos por cada serie: del año de su primer corte
+    # al de su último corte
+    valid = ~np.isnan(values)
+    first_year = knots[valid.argmax(axis=1)].year.to_numpy()
+    last_year = knots[valid.shape[1] - 1 - valid[:, ::-1].argmax(axis=1)].year.to_numpy()
+
+    values = _interpolate_rows(values, t)
+
+    # Trapecios entre nodos consecutivos, en fracción del año natural
+    days_in_year = np.where(knots[:-1].is_leap_year, 366.0, 365.0)
+    dt = np.diff(t) / days_in_year
+    areas = (values[:, :-1] + values[:, 1:]) / 2 * dt
+
+    # Cada tramo pertenece al periodo de su nodo izquierdo
+    segment_period = bounds.searchsorted(knots[:-1], side="right") - 1
+    starts = np.flatnonzero(np.r_[True, np.diff(segment_period) != 0])
+    exposure = np.add.reduceat(areas, starts, axis=1)
+
+    periods = bounds[segment_period[starts]]
+    period_year = periods.year.to_numpy()
+    covered = (period_year[None, :] >= first_year[:, None]) & (
+        period_year[None, :] <= last_year[:, None]
+    )
+    exposure[~covered] = np.nan
+
+    result = pd.DataFrame(exposure, index=wide.index, columns=periods)
+    result.columns.name = "inicio"
+
+    return (
+        result.stack()
+        .dropna()
+        .rename("personas_anio")
+        .reset_index()
+    )
+
+
+def annual_person_years(df, keys=("grupo_edad", "nacionalidad"), date_col="fecha"):
+    """
+    Personas-año por año natural (= población media anual).
+
+    Devuelve un DataFrame con:
+    - anio
+    - keys
+    - poblacion
+    """
+    py = person_years(df, keys=keys, date_col=date_col, freq="YS")
+    py.insert(0, "anio", py.pop("inicio").dt.year)
+
+    return py.rename(columns={"personas_anio": "poblacion"})
@@ -0,0 +1,493 @@
+import pandas as pd
+
+from data_ingestion import (
+    resolve_source,
+    load_births,
+    load_women_15_49,
+    load_fertility_rates,
+    load_tfr,
+)
+from preprocessing import (
+    group_foreigners,
+    age_group_bounds,
+    normalize_official_tfr,
+    rescale_official_tfr,
+)
+from smoothing import smooth_frame
+from small_area import shrink_fertility_rates
+from apc import fit_apc
+from analysis import (
+    build_pseudo_cohorts,
+    compare_asfr_by_age,
+    compute_tfr_from_rates,
+    mean_age_at_childbearing,
+    build_population_mean_15_49,
+    kitagawa_decomposition,
+    merge_population_and_fertility_rates,
+)
+
+# =====================
+# PARÁMETROS DEL ESTUDIO
+# =====================
+DEFAULT_PARAMS = {
+    "anio_inicio": 2002,
+    "anio_fin": 2024,
+    "anios_kitagawa": [2010, 2020],
+    "anios_resumen": [2002, 2010, 2015, 2020, 2024],
+    # Suavizado: media_movil, exponencial, whittaker o hp
+    "metodo_suavizado": "media_movil",
+    "ventana_suavizado": 3,
+    "alpha_suavizado": None,
+    "lambda_suavizado": None,
+    # Rango de edades (None = sin límite)
+    "edad_min": None,
+    "edad_max": None,
+    "agrupacion": "binaria",
+    # Contracción Bayes empírica de las tasas: None, momentos o verosimilitud
+    "contraccion_eb": None,
+    # Modelo edad-periodo-cohorte: None o la restricción de identificación
+    # (cohortes_iguales, sin_cohorte, sin_periodo)
+    "apc_identificacion": None,
+}
+
+# Agrupaciones de nacionalidad disponibles. Las tasas del INE solo
+# distinguen española / extranjera, así que cualquier agrupación nueva
+# debe producir esas dos etiquetas para cruzar con ellas.
+GROUPINGS = {
+    "binaria": group_foreigners,
+}
+
+
+# Entradas del estudio: fichero por defecto y loader
+INPUT_FILES = {
+    "births": ("births_by_nationality.csv", load_births),
+    "women": ("women_15_49_by_nationality.csv", load_women_15_49),
+    "fertility": ("fertility_rates_by_age_and_nationality.csv", load_fertility_rates),
+    "tfr": ("tfr_by_nationality.csv", load_tfr),
+}
+
+
+def data_sources(directory=None):
+    """
+    Fuente de cada entrada en un directorio de datos (véase
+    data_ingestion.resolve_source). Sin directorio, los ficheros por
+    defecto.
+    """
+    if directory is None:
+        return {}
+    return {
+        name: resolve_source(directory, filename)
+        for name, (filename, _) in INPUT_FILES.items()
+    }
+
+
+def load_inputs(sources=None, options=None):
+    """
+    Lee los ficheros de entrada tal y como los devuelven los loaders.
+
+    Parámetros
+    ----------
+    sources : directorio de datos o diccionario entrada -> fuente
+        (fichero, directorio de particiones o patrón glob). Las entradas
+        que falten usan el fichero por defecto.
+    options : diccionario entrada -> argumentos del loader
+        (max_workers, executor, verbose, partition_col).
+    """
+    if sources is None or not isinstance(sources, dict):
+        sources = data_sources(sources)
+    options = options or {}
+
+    return {
+        name: loader(sources.get(name), **options.get(name, {}))
+        for name, (_, loader) in INPUT_FILES.items()
+    }
+
+
+def normalize_inputs(raw, agrupacion="binaria"):
+    """
+    Agrupa nacionalidades y construye la exposición (personas-año) por
+    edad. Es la parte costosa y solo depende de la agrupación, por lo
+    que se comparte entre todas las ejecuciones que la usan.
+
+    Solo se normalizan las entradas presentes en raw (las etapas del
+    grafo lo llaman con una sola).
+
+    Devuelve un diccionario con:
+    - births
+    - population (anio, grupo_edad, nacionalidad, poblacion)
+    - fertility
+    """
+    group = GROUPINGS[agrupacion]
+    normalized = {}
+    if "births" in raw:
+        normalized["births"] = group(raw["births"])
+    if "women" in raw:
+        normalized["population"] = build_population_mean_15_49(group(raw["women"]))
+    if "fertility" in raw:
+        normalized["fertility"] = group(raw["fertility"])
+
+    return normalized
+
+
+def _filter_ages(df, edad_min, edad_max):
+    bounds = age_group_bounds(df["grupo_edad"])
+    mask = pd.Series(True, index=bounds.index)
+    if edad_min is not None:
+        mask &= bounds["edad_inicio"] >= edad_min
+    if edad_max is not None:
+        mask &= bounds["edad_fin"] <= edad_max
+    return df[mask.to_numpy()]
+
+
+def _filter_years(df, anio_inicio, anio_fin):
+    return df[(df["anio"] >= anio_inicio) & (df["anio"] <= anio_fin)]
+
+
+def _series_keys(df):
+    """
+    Columnas que identifican cada serie temporal (nacionalidad y, si
+    existe, región).
+    """
+    return [c for c in ("nacionalidad", "region") if c in df.columns]
+
+
+def smooth(df, value_cols, params):
+    """
+    Suaviza value_cols de todas las series de df según los parámetros
+    de suavizado de la ejecución.
+    """
+    return smooth_frame(
+        df,
+        value_cols,
+        by=_series_keys(df),
+        metodo=params["metodo_suavizado"],
+        ventana=params["ventana_suavizado"],
+        alpha=params["alpha_suavizado"],
+        lam=params["lambda_suavizado"],
+    )
+
+
+def _decategorize(df):
+    """
+    Devuelve las columnas categóricas (dimensiones de un cubo compartido)
+    al tipo de sus etiquetas. Se aplica después de filtrar, de modo que
+    solo se copian las filas de la ejecución.
+    """
+    categorical = [
+        c for c in df.columns if isinstance(df[c].dtype, pd.CategoricalDtype)
+    ]
+    if not categorical:
+        return df
+    return df.astype({c: df[c].cat.categories.dtype for c in categorical})
+
+
+def select_inputs(normalized, params):
+    """
+    Aplica la ventana temporal y el rango de edades de una ejecución a
+    las entradas presentes en normalized.
+    """
+    years = (params["anio_inicio"], params["anio_fin"])
+    ages = (params["edad_min"], params["edad_max"])
+
+    selected = {}
+    for name, df in normalized.items():
+        df = _filter_years(df, *years)
+        # Los nacimientos no tienen edad
+        if name != "births":
+            df = _filter_ages(df, *ages)
+        selected[name] = _decategorize(df)
+
+    return selected
+
+
+# =====================
+# ETAPAS DEL ESTUDIO
+# =====================
+def _input_stage(raw_name):
+    """
+    Etapa que normaliza y selecciona una entrada, con las mismas
+    funciones que el cálculo por lotes.
+    """
+    def stage(c, params):
+        raw = {raw_name: c[f"raw_{raw_name}"]}
+        return select_inputs(normalize_inputs(raw, params["agrupacion"]), params)
+
+    return stage
+
+
+def _stage_rates(c, params):
+    # Las celdas con regiones se contraen hacia el perfil nacional
+    if not params["contraccion_eb"]:
+        return {"tasas": c["fertility"]}
+    return {
+        "tasas": shrink_fertility_rates(
+            c["fertility"],
+            c["population"],
+            prior_by=["anio", "grupo_edad", "nacionalidad"],
+            metodo=params["contraccion_eb"],
+        )
+    }
+
+
+def _stage_birth_rate(c, params):
+    # Tasa de nacimientos por 1.000 mujeres, por serie (nacionalidad y,
+    # si ambas entradas la tienen, región)
+    keys = ["anio"] + [
+        k for k in _series_keys(c["births"]) if k in c["population"].columns
+    ]
+    births = c["births"].groupby(keys, as_index=False, sort=False)["nacimientos"].sum()
+    df_rate = births.merge(
+        c["population"].groupby(keys, as_index=False)["poblacion"].sum(),
+        on=keys,
+    )
+    df_rate["rate_per_1000"] = df_rate["nacimientos"] / df_rate["poblacion"] * 1000
+    df_rate["rate_smoothed"] = smooth(df_rate, ["rate_per_1000"], params)
+
+    return {"tasa_nacimientos": df_rate}
+
+
+def _stage_intensity_ratio(c, params):
+    # Ratio de intensidad reproductiva
+    df_rate = c["tasa_nacimientos"]
+    index = ["anio"] + [k for k in _series_keys(df_rate) if k != "nacionalidad"]
+    pivot = df_rate.pivot(
+        index=index,
+        columns="nacionalidad",
+        values="rate_per_1000",
+    )
+    pivot["ratio"] = pivot["extranjera"] / pivot["espanola"]
+    ratio = pivot.reset_index()
+    ratio.columns.name = None
+    ratio["ratio_smoothed"] = smooth(ratio, ["ratio"], params)
+
+    return {"ratio_intensidad": ratio}
+
+
+def _stage_asfr(c, params):
+    return {"asfr": compare_asfr_by_age(c["tasas"])}
+
+
+def _stage_tfr(c, params):
+    keys = _series_keys(c["tasas"])
+    tfr = compute_tfr_from_rates(c["tasas"], by=["anio"] + keys)
+    tfr["tfr_smoothed"] = smooth(tfr, ["tfr_calculado"], params)
+    return {"tfr": tfr}
+
+
+def _stage_mac(c, params):
+    keys = _series_keys(c["tasas"])
+    mac = mean_age_at_childbearing(c["tasas"], by=["anio"] + keys)
+    mac["edad_media_smoothed"] = smooth(mac, ["edad_media_maternidad"], params)
+    return {"edad_media": mac}
+
+
+def _stage_population_and_rates(c, params):
+    return {
+        "poblacion_tasas": merge_population_and_fertility_rates(
+            c["population"], c["tasas"]
+        )
+    }
+
+
+def _stage_kitagawa(c, params):
+    # La descomposición es nacional: con regiones se agregan población y
+    # nacimientos esperados y se recalcula la tasa
+    m = c["poblacion_tasas"]
+    if "region" in m.columns:
+        m = m.groupby(["anio", "grupo_edad", "nacionalidad"], as_index=False)[
+            ["poblacion", "nacimientos_esperados"]
+        ].sum()
+        m["tasa"] = m["nacimientos_esperados"] / m["poblacion"] * 1000
+
+    totals, by_age = [], []
+    for year in params["anios_kitagawa"]:
+        k = kitagawa_decomposition(m, year)
+        by_age.append(k.pop("contribuciones_por_edad").assign(anio=year))
+        totals.append(k)
+    if not by_age:
+        by_age = [pd.DataFrame(columns=["grupo_edad", "efecto_estructura", "efecto_tasas", "anio"])]
+
+    return {
+        "kitagawa": pd.DataFrame(totals),
+        "kitagawa_edad": pd.concat(by_age, ignore_index=True),
+    }
+
+
+def _stage_summary(c, params):
+    # Resumen anual por serie
+    df_rate = c["tasa_nacimientos"]
+    keys = ["anio"] + [k for k in _series_keys(df_rate) if k in c["tfr"].columns]
+    return {
+        "resumen": (
+            df_rate[keys + ["rate_per_1000"]]
+            .merge(c["tfr"], on=keys)
+            .merge(c["edad_media"], on=keys)
+        )
+    }
+
+
+def _stage_pseudo_cohorts(c, params):
+    return {"pseudo_cohortes": build_pseudo_cohorts(c["tasas"])}
+
+
+def _stage_apc(c, params):
+    # Modelo APC con interacción nacionalidad × edad
+    apc = fit_apc(c["poblacion_tasas"], params["apc_identificacion"])
+    return {
+        "apc": apc["coeficientes"].assign(
+            devianza=apc["devianza"],
+            gl=apc["gl"],
+        )
+    }
+
+
+def _stage_official_tfr(c, params):
+    official = GROUPINGS[params["agrupacion"]](c["raw_tfr"])
+    official = _filter_years(official, params["anio_inicio"], params["anio_fin"])
+    official, _ = rescale_official_tfr(
+        normalize_official_tfr(official),
+        c["tfr"][["anio", "nacionalidad", "tfr_calculado"]],
+    )
+    return {"tfr_oficial": official}
+
+
+# Grafo de etapas, en orden topológico. Cada etapa declara:
+# - entradas: resultados (o ficheros raw_*) que necesita
+# - salidas: resultados que produce
+# - si: entradas adicionales cuando el parámetro indicado está activo
+# - requiere: parámetro sin el cual la etapa no se ejecuta
+STAGES = {
+    "nacimientos": {"entradas": ("raw_births",), "salidas": ("births",), "funcion": _input_stage("births")},
+    "exposicion": {"entradas": ("raw_women",), "salidas": ("population",), "funcion": _input_stage("women")},
+    "fecundidad": {"entradas": ("raw_fertility",), "salidas": ("fertility",), "funcion": _input_stage("fertility")},
+    "tasas": {
+        "entradas": ("fertility",),
+        "si": {"contraccion_eb": ("population",)},
+        "salidas": ("tasas",),
+        "funcion": _stage_rates,
+    },
+    "tasa_nacimientos": {
+        "entradas": ("births", "population"),
+        "salidas": ("tasa_nacimientos",),
+        "funcion": _stage_birth_rate,
+    },
+    "ratio_intensidad": {
+        "entradas": ("tasa_nacimientos",),
+        "salidas": ("ratio_intensidad",),
+        "funcion": _stage_intensity_ratio,
+    },
+    "asfr": {"entradas": ("tasas",), "salidas": ("asfr",), "funcion": _stage_asfr},
+    "tfr": {"entradas": ("tasas",), "salidas": ("tfr",), "funcion": _stage_tfr},
+    "edad_media": {"entradas": ("tasas",), "salidas": ("edad_media",), "funcion": _stage_mac},
+    "poblacion_tasas": {
+        "entradas": ("population", "tasas"),
+        "salidas": ("poblacion_tasas",),
+        "funcion": _stage_population_and_rates,
+    },
+    "kitagawa": {
+        "entradas": ("poblacion_tasas",),
+        "salidas": ("kitagawa", "kitagawa_edad"),
+        "funcion": _stage_kitagawa,
+    },
+    "resumen": {
+        "entradas": ("tasa_nacimientos", "tfr", "edad_media"),
+        "salidas": ("resumen",),
+        "funcion": _stage_summary,
+    },
+    "pseudo_cohortes": {
+        "entradas": ("tasas",),
+        "salidas": ("pseudo_cohortes",),
+        "funcion": _stage_pseudo_cohorts,
+    },
+    "apc": {
+        "entradas": ("poblacion_tasas",),
+        "requiere": "apc_identificacion",
+        "salidas": ("apc",),
+        "funcion": _stage_apc,
+    },
+    "tfr_oficial": {
+        "entradas": ("raw_tfr", "tfr"),
+        "salidas": ("tfr_oficial",),
+        "funcion": _stage_official_tfr,
+    },
+}
+
+# Resultados que devuelve compute_indicators, en este orden
+INDICATORS = (
+    "tasa_nacimientos",
+    "ratio_intensidad",
+    "asfr",
+    "tfr",
+    "edad_media",
+    "kitagawa",
+    "kitagawa_edad",
+    "resumen",
+    "pseudo_cohortes",
+    "apc",
+)
+
+
+def stage_inputs(name, params):
+    """
+    Entradas de una etapa para unos parámetros.
+    """
+    stage = STAGES[name]
+    inputs = list(stage["entradas"])
+    for param, extra in stage.get("si", {}).items():
+        if params[param]:
+            inputs.extend(extra)
+    return inputs
+
+
+def run_stages(cache, params, changed=()):
+    """
+    Ejecuta el grafo de etapas sobre cache (diccionario de resultados,
+    que se actualiza en el sitio).
+
+    Se ejecuta cada etapa activa cuyas entradas estén disponibles y que
+    no tenga aún sus salidas o dependa (directa o indirectamente) de
+    algo en changed. Las demás conservan sus resultados.
+
+    Devuelve la lista de etapas ejecutadas.
+    """
+    changed = set(changed)
+    executed = []
+
+    for name, stage in STAGES.items():
+        if stage.get("requiere") and not params[stage["requiere"]]:
+            continue
+        inputs = stage_inputs(name, params)
+        if not all(i in cache for i in inputs):
+            continue
+        fresh = all(o in cache for o in stage["salidas"])
+        if fresh and not changed.intersection(inputs):
+            continue
+
+        cache.update(stage["funcion"](cache, params))
+        changed.update(stage["salidas"])
+        executed.append(name)
+
+    return executed
+
+
+def compute_indicators(inputs, params):
+    """
+    Calcula todos los indicadores del estudio para unos parámetros a
+    partir de las entradas de select_inputs.
+
+    Devuelve un diccionario de DataFrames:
+    - tasa_nacimientos: nacimientos por 1.000 mujeres y su suavizado
+    - ratio_intensidad: ratio extranjera / española de la tasa y su suavizado
+    - asfr: comparación de tasas específicas por edad
+    - tfr: TFR calculado y su suavizado
+    - edad_media: edad media a la maternidad y su suavizado
+    - kitagawa: totales de la descomposición por año
+    - kitagawa_edad: contribuciones por grupo de edad y año
+    - resumen: tasa, TFR y edad media por año y nacionalidad
+    - pseudo_cohortes: tasas específicas por cohorte aproximada
+    - apc: coeficientes del modelo edad-periodo-cohorte (si se pide)
+    """
+    cache = dict(inputs)
+    run_stages(cache, params)
+
+    return {name: cache[name] for name in INDICATORS if name in cache}
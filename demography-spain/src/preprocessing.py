@@ -1,4 +1,7 @@
 import pandas as pd
+
+from exposure import annual_person_years
+
 MONTHS_ES_TO_EN = {
     "enero": "January",
     "febrero": "February",
@@ -24,6 +27,9 @@ def group_foreigners(df):
     Regla:
     - cualquier variante de 'Espaniola' -> espanola
     - cualquier otro valor -> extranjera
+
+    Se compara el inicio de la etiqueta: 'Pais de la UE28 sin Espania'
+    también contiene 'espan' y es población extranjera.
     """
     df = df.copy()
 
@@ -35,20 +41,85 @@ def group_foreigners(df):
     )
 
     df["nacionalidad"] = df["nacionalidad"].apply(
-        lambda x: "espanola" if "espan" in x else "extranjera"
+        lambda x: "espanola" if x.startswith("espan") else "extranjera"
     )
 
     return df
 
+def parse_snapshot_dates(values):
+    """
+    Convierte fechas de corte en texto español ("1 de enero de 2022")
+    a datetime de forma vectorizada.
+
+    Los valores que no siguen el patrón devuelven NaT, para que el
+    llamador decida si descartarlos o informar de ellos.
+    """
+    parts = (
+        pd.Series(values)
+        .astype(str)
+        .str.strip()
+        .str.lower()
+        .str.extract(r"^(\d{1,2}) de (\w+) de (\d{4})$")
+    )
+    month_en = parts[1].map(MONTHS_ES_TO_EN)
+
+    return pd.to_datetime(
+        parts[0] + " " + month_en + " " + parts[2],
+        format="%d %B %Y",
+        errors="coerce",
+    )
+
+def add_month_dates(df):
+    """
+    Añade la columna 'fecha' (primer día del mes) a partir de 'anio' y
+    del nombre del mes en español de la columna 'mes'.
+    """
+    df = df.copy()
+    month_en = df["mes"].astype(str).str.strip().str.lower().map(MONTHS_ES_TO_EN)
+
+    df["fecha"] = pd.to_datetime(
+        df["anio"].astype(str) + " " + month_en,
+        format="%Y %B",
+        errors="coerce",
+    )
+
+    return df
+
+def age_group_bounds(values):
+    """
+    Edades inicial y final de cada etiqueta de grupo de edad:
+    - "De 15 a 19 anios" -> 15, 19
+    - "50 y mas anios"   -> 50, inf
+    - "32 anios"         -> 32, 32
+
+    Devuelve un DataFrame con:
+    - edad_inicio
+    - edad_fin
+    """
+    parts = (
+        pd.Series(values)
+        .astype(str)
+        .str.extract(r"^(?:De )?(\d+)(?: a (\d+)| (y mas))? anios$")
+    )
+    start = parts[0].astype(float)
+    end = parts[1].astype(float).fillna(start)
+    end = end.mask(parts[2].notna(), float("inf"))
+
+    return pd.DataFrame({"edad_inicio": start, "edad_fin": end})
+
 def compute_mean_annual_population(df):
     """
-    Calcula la población femenina media anual (15–49) a partir de cortes
-    semestrales (enero / julio).
+    Calcula la población femenina media anual (15–49) como personas-año
+    de exposición a partir de los cortes de población disponibles
+    (enero / julio u otros).
 
     Supuestos:
-    - La media simple enero-julio aproxima la población media anual.
+    - La población evoluciona linealmente entre cortes; el año se integra
+      por trapecios e incluye el 1 de enero siguiente si existe
+      (ver exposure.person_years).
     - La población está desagregada por grupo de edad y nacionalidad.
-    - La columna 'anio' contiene fechas en formato textual en español."""
+    - La columna 'anio' contiene fechas en formato textual en español.
+      Las fechas no reconocidas se descartan (validation las reporta)."""
     df = df.copy()
 
     # 1️⃣ Convertir población a numérico
@@ -59,33 +130,11 @@ def compute_mean_annual_population(df):
         .astype(int)
     )
 
-    # 2️⃣ Normalizar meses al inglés (robusto al locale)
-    for es, en in MONTHS_ES_TO_EN.items():
-        df["anio"] = df["anio"].str.replace(es, en, regex=False)
-
-    # 3️⃣ Parsear fecha
-    df["fecha"] = pd.to_datetime(
-        df["anio"],
-        format="%d de %B de %Y",
-        errors="coerce"
-    )
-
-    # 4️⃣ Extraer año calendario
-    df["anio"] = df["fecha"].dt.year
-
-    # 5️⃣ Eliminar observaciones sin fecha válida
-    df = df.dropna(subset=["anio"])
+    # 2️⃣ Parsear fecha (meses en español, robusto al locale)
+    df["fecha"] = parse_snapshot_dates(df["anio"])
 
-    df["anio"] = df["anio"].astype(int)
-
-    # 6️⃣ Calcular población media anual
-    df_mean = (
-        df.groupby(
-            ["anio", "grupo_edad", "nacionalidad"],
-            as_index=False
-        )["poblacion"]
-        .mean()
-    )
+    # 3️⃣ Personas-año por año natural
+    df_mean = annual_person_years(df, keys=["grupo_edad", "nacionalidad"])
 
     return df_mean
  
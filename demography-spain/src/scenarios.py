@@ -0,0 +1,159 @@
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from pipeline import (
+    DEFAULT_PARAMS,
+    load_inputs,
+    normalize_inputs,
+    select_inputs,
+    compute_indicators,
+)
+from shared_cube import publish_normalized, attach_normalized, release_cube
+from validation import validate_inputs, has_errors
+
+# Entradas normalizadas de cada proceso trabajador, por agrupación
+_WORKER_INPUTS = {}
+# Cubos compartidos a los que está conectado el proceso trabajador
+_WORKER_CUBES = []
+
+
+def load_config(path):
+    """
+    Lee un fichero de configuración JSON de escenarios:
+
+    {
+        "base": {"anio_inicio": 2002, "anio_fin": 2024},
+        "grid": {
+            "ventana_suavizado": [1, 3, 5],
+            "edad_min": [15, 20]
+        }
+    }
+
+    - base: parámetros comunes (sobre DEFAULT_PARAMS)
+    - grid: listas de valores; se ejecuta su producto cartesiano
+    """
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def expand_grid(config):
+    """
+    Expande la rejilla de parámetros en una lista de ejecuciones.
+    """
+    base = {**DEFAULT_PARAMS, **config.get("base", {})}
+    unknown = (set(base) | set(config.get("grid", {}))) - set(DEFAULT_PARAMS)
+    if unknown:
+        raise ValueError(f"Parámetros desconocidos: {sorted(unknown)}")
+
+    grid = config.get("grid", {})
+    names = list(grid)
+
+    return [
+        {**base, **dict(zip(names, values))}
+        for values in itertools.product(*(grid[n] for n in names))
+    ]
+
+
+def _init_worker(normalized):
+    _WORKER_INPUTS.update(normalized)
+
+
+def _init_shared_worker(cube_names):
+    """
+    Conecta el proceso a los cubos publicados (sin copiar los datos).
+    """
+    for agrupacion, name in cube_names.items():
+        normalized, attached = attach_normalized(name)
+        _WORKER_INPUTS[agrupacion] = normalized
+        _WORKER_CUBES.append(attached)
+
+
+def _run_one(params):
+    inputs = select_inputs(_WORKER_INPUTS[params["agrupacion"]], params)
+    return compute_indicators(inputs, params)
+
+
+def _collect(runs, outputs):
+    """
+    Une las salidas de todas las ejecuciones en un único almacén:
+    un DataFrame por indicador indexado por run_id.
+    """
+    names = dict.fromkeys(name for out in outputs for name in out)
+    results = {}
+    for name in names:
+        run_ids = [i for i, out in zip(runs.index, outputs) if name in out]
+        results[name] = pd.concat(
+            [outputs[i][name] for i in run_ids],
+            keys=run_ids,
+            names=["run_id"],
+        ).droplevel(1)
+
+    return results
+
+
+def run_scenarios(config, max_workers=None, raw=None, shared=True, sources=None):
+    """
+    Ejecuta todas las variantes del estudio definidas en la configuración.
+
+    Los ficheros se leen y validan una sola vez y las entradas se
+    normalizan una vez por agrupación de nacionalidad; cada proceso
+    recibe esas entradas al arrancar y solo aplica los filtros y cálculos
+    propios de cada ejecución.
+
+    Con shared=True las entradas normalizadas se publican en memoria
+    compartida (shared_cube) y los procesos se conectan a ellas en lugar
+    de recibir una copia serializada.
+
+    Sin raw, las entradas se leen de sources (directorio de datos o
+    diccionario entrada -> fuente, véase pipeline.load_inputs).
+
+    Devuelve:
+    - runs: DataFrame de parámetros indexado por run_id
+    - results: diccionario indicador -> DataFrame indexado por run_id
+    """
+    params_list = expand_grid(config)
+    runs = pd.DataFrame(params_list)
+    runs.index.name = "run_id"
+
+    if raw is None:
+        raw = load_inputs(sources)
+        report = validate_inputs(raw["births"], raw["women"], raw["fertility"], raw["tfr"])
+        if has_errors(report):
+            raise ValueError("Los datos de entrada no superan la validación")
+
+    normalized = {
+        agrupacion: normalize_inputs(raw, agrupacion)
+        for agrupacion in runs["agrupacion"].unique()
+    }
+
+    max_workers = max_workers or config.get("workers") or os.cpu_count()
+    if max_workers == 1:
+        _init_worker(normalized)
+        outputs = [_run_one(p) for p in params_list]
+    else:
+        cubes = {}
+        if shared:
+            cubes = {a: publish_normalized(n) for a, n in normalized.items()}
+            initializer, initargs = _init_shared_worker, (
+                {a: cube["name"] for a, cube in cubes.items()},
+            )
+        else:
+            initializer, initargs = _init_worker, (normalized,)
+
+        try:
+            with ProcessPoolExecutor(
+                max_workers=max_workers,
+                initializer=initializer,
+                initargs=initargs,
+            ) as pool:
+                chunksize = max(1, len(params_list) // (4 * max_workers))
+                outputs = list(pool.map(_run_one, params_list, chunksize=chunksize))
+        finally:
+            for cube in cubes.values():
+                release_cube(cube, unlink=True)
+
+    return runs, _collect(runs, outputs)
@@ -0,0 +1,172 @@
+import numpy as np
+import pandas as pd
+
+from exposure import person_years
+from preprocessing import add_month_dates, parse_snapshot_dates
+
+# Media móvil centrada 2×12 de la descomposición clásica
+_TREND_WEIGHTS = np.r_[0.5, np.ones(11), 0.5] / 12
+
+
+def _series_keys(df):
+    return [c for c in ("nacionalidad", "region") if c in df.columns]
+
+
+def build_monthly_store(births_monthly, women):
+    """
+    Almacén mensual: nacimientos, exposición y tasa por mes y serie.
+
+    La exposición son las personas-año de cada mes natural integradas a
+    partir de los cortes de población (exposure.person_years), así que
+    sumando los meses de un año se obtiene la exposición anual.
+
+    Parámetros
+    ----------
+    births_monthly : DataFrame
+        Salida de load_monthly_births (nacionalidades ya agrupadas).
+    women : DataFrame
+        Salida de load_women_15_49 (nacionalidades ya agrupadas).
+
+    Devuelve un DataFrame con:
+    - nacionalidad (y region si existe)
+    - fecha (primer día del mes), anio, mes
+    - nacimientos
+    - personas_anio
+    - tasa_mensual (nacimientos por 1.000 mujeres-año)
+    """
+    keys = _series_keys(births_monthly)
+
+    births = (
+        add_month_dates(births_monthly)
+        .dropna(subset=["fecha"])
+        .groupby(keys + ["fecha"], as_index=False)["nacimientos"]
+        .sum()
+    )
+
+    exposure = person_years(
+        women.assign(fecha=parse_snapshot_dates(women["anio"])),
+        keys=keys,
+        freq="MS",
+    ).rename(columns={"inicio": "fecha"})
+
+    store = births.merge(exposure, on=keys + ["fecha"], how="left")
+    store["anio"] = store["fecha"].dt.year
+    store["mes"] = store["fecha"].dt.month
+    store["tasa_mensual"] = store["nacimientos"] / store["personas_anio"] * 1000
+
+    return store[
+        keys + ["fecha", "anio", "mes", "nacimientos", "personas_anio", "tasa_mensual"]
+    ]
+
+
+def _centered_trend(values):
+    """
+    Tendencia 2×12 de todas las series a la vez. Los seis primeros y
+    últimos meses (y las ventanas con huecos) quedan en NaN.
+    """
+    trend = np.full(values.shape, np.nan)
+    if values.shape[1] < len(_TREND_WEIGHTS):
+        return trend
+
+    windows = np.lib.stride_tricks.sliding_window_view(
+        values, len(_TREND_WEIGHTS), axis=1
+    )
+    trend[:, 6:-6] = windows @ _TREND_WEIGHTS
+
+    return trend
+
+
+def decompose_seasonal(
+    store,
+    value_col="nacimientos",
+    modelo="multiplicativo",
+    excluir_anios=(),
+):
+    """
+    Descomposición estacional clásica de todas las series mensuales
+    (nacionalidad, región) en una sola operación matricial:
+
+    - tendencia: media móvil centrada 2×12
+    - estacional: media por mes del cociente (o diferencia) con la
+      tendencia, normalizada a media 1 (o 0)
+    - residuo: lo que queda
+
+    excluir_anios permite estimar los índices estacionales sin años
+    anómalos (p. ej. 2020 y 2021), de modo que la perturbación aparece
+    entera en el residuo.
+
+    Devuelve un DataFrame con:
+    - claves de serie, fecha
+    - valor, tendencia, estacional, residuo
+    """
+    keys = _series_keys(store)
+    multiplicative = modelo == "multiplicativo"
+
+    wide = store.set_index(keys + ["fecha"])[value_col].unstack("fecha")
+    months = pd.date_range(wide.columns.min(), wide.columns.max(), freq="MS")
+    wide = wide.reindex(columns=months)
+    values = wide.to_numpy(dtype=float)
+
+    trend = _centered_trend(values)
+    detrended = values / trend if multiplicative else values - trend
+    detrended[:, months.year.isin(list(excluir_anios))] = np.nan
+
+    month_of = months.month.to_numpy() - 1
+    sums = np.zeros((len(wide), 12))
+    counts = np.zeros((len(wide), 12))
+    valid = ~np.isnan(detrended)
+    np.add.at(sums.T, month_of, np.where(valid, detrended, 0.0).T)
+    np.add.at(counts.T, month_of, valid.T)
+    index = np.divide(sums, counts, out=np.full(sums.shape, np.nan), where=counts > 0)
+
+    if multiplicative:
+        index = index / np.nanmean(index, axis=1, keepdims=True)
+        seasonal = index[:, month_of]
+        residual = values / (trend * seasonal)
+    else:
+        index = index - np.nanmean(index, axis=1, keepdims=True)
+        seasonal = index[:, month_of]
+        residual = values - trend - seasonal
+
+    parts = {
+        "valor": values,
+        "tendencia": trend,
+        "estacional": seasonal,
+        "residuo": residual,
+    }
+    result = pd.concat(
+        {
+            name: pd.DataFrame(arr, index=wide.index, columns=months).stack()
+            for name, arr in parts.items()
+        },
+        axis=1,
+    )
+    result.index = result.index.set_names(keys + ["fecha"])
+
+    return result.reset_index()
+
+
+def annual_from_monthly(store):
+    """
+    Indicadores anuales derivados del almacén mensual, sin volver a leer
+    los ficheros: nacimientos y exposición anuales y tasa por 1.000
+    mujeres. Solo se incluyen los años con los 12 meses completos.
+
+    Devuelve un DataFrame con el formato de la tasa anual del estudio:
+    - anio
+    - nacionalidad (y region si existe)
+    - nacimientos
+    - poblacion
+    - rate_per_1000
+    """
+    keys = _series_keys(store)
+
+    annual = store.groupby(["anio"] + keys).agg(
+        nacimientos=("nacimientos", "sum"),
+        poblacion=("personas_anio", "sum"),
+        meses=("personas_anio", "count"),
+    )
+    annual = annual[annual["meses"] == 12].drop(columns="meses").reset_index()
+    annual["rate_per_1000"] = annual["nacimientos"] / annual["poblacion"] * 1000
+
+    return annual
@@ -0,0 +1,289 @@
+import json
+import struct
+from multiprocessing import shared_memory
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Cabecera: identificador + longitud del JSON de etiquetas
+MAGIC = b"NATCUBE1"
+_PREFIX = struct.Struct("<8sQ")
+_ALIGN = 64
+
+# Variables publicadas a partir de las entradas normalizadas
+# (entrada, columna de valor, dimensiones)
+CUBE_VARIABLES = {
+    "nacimientos": ("births", "nacimientos", ["anio", "nacionalidad"]),
+    "poblacion": ("population", "poblacion", ["anio", "grupo_edad", "nacionalidad"]),
+    "tasa": ("fertility", "tasa", ["anio", "grupo_edad", "nacionalidad"]),
+}
+
+
+def _align(n):
+    return -(-n // _ALIGN) * _ALIGN
+
+
+def _to_label(value):
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def to_array(df, dims, value_col):
+    """
+    Pasa un DataFrame largo a un array denso (una dimensión por columna
+    de dims, etiquetas ordenadas). Las celdas sin dato quedan en NaN.
+
+    Las filas que repiten claves (p. ej. nacimientos de varios orígenes
+    extranjeros tras group_foreigners) se suman en una sola celda, como
+    hacen las etapas del pipeline al agregar.
+
+    Devuelve:
+    - array float64
+    - diccionario dimensión -> lista de etiquetas
+    """
+    if df.duplicated(subset=dims).any():
+        df = df.groupby(dims, as_index=False)[value_col].sum(min_count=1)
+
+    codes, labels = [], {}
+    for dim in dims:
+        c, uniques = pd.factorize(df[dim], sort=True)
+        codes.append(c)
+        labels[dim] = [_to_label(u) for u in uniques]
+
+    arr = np.full([len(labels[d]) for d in dims], np.nan)
+    arr[tuple(codes)] = df[value_col].to_numpy(dtype=float)
+
+    return arr, labels
+
+
+def build_cube(normalized):
+    """
+    Construye el cubo de indicadores (arrays + etiquetas) a partir de las
+    entradas normalizadas de pipeline.normalize_inputs.
+
+    Si las entradas traen columna 'region' se añade como dimensión.
+    """
+    cube = {}
+    for name, (source, value_col, dims) in CUBE_VARIABLES.items():
+        df = normalized[source]
+        if "region" in df.columns:
+            dims = dims + ["region"]
+        arr, labels = to_array(df, dims, value_col)
+        cube[name] = {"dims": dims, "labels": labels, "data": arr}
+
+    return cube
+
+
+def _layout(cube):
+    """
+    Cabecera JSON y tamaño total del bloque. Los offsets son relativos al
+    inicio de los datos, que empieza alineado tras la cabecera.
+    """
+    header = {"variables": {}}
+    offset = 0
+    for name, var in cube.items():
+        header["variables"][name] = {
+            "dims": var["dims"],
+            "labels": var["labels"],
+            "shape": list(var["data"].shape),
+            "dtype": var["data"].dtype.str,
+            "offset": offset,
+        }
+        offset = _align(offset + var["data"].nbytes)
+
+    raw = json.dumps(header).encode("utf-8")
+
+    return header, raw, _data_start(len(raw)) + offset
+
+
+def _data_start(header_length):
+    return _align(_PREFIX.size + header_length)
+
+
+def publish_cube(cube, path=None):
+    """
+    Copia el cubo una única vez a un bloque compartido:
+    - path=None: multiprocessing.shared_memory
+    - path: fichero mapeado en memoria
+
+    Devuelve un diccionario con:
+    - name: nombre del bloque o ruta del fichero (para attach_cube)
+    - buffer: objeto que mantiene vivo el bloque (ver release_cube)
+    """
+    header, raw, size = _layout(cube)
+
+    if path is None:
+        shm = shared_memory.SharedMemory(create=True, size=size)
+        buf, name, owner = shm.buf, shm.name, shm
+    else:
+        path = Path(path)
+        mm = np.memmap(path, dtype=np.uint8, mode="w+", shape=(size,))
+        buf, name, owner = mm, str(path), mm
+
+    _PREFIX.pack_into(buf, 0, MAGIC, len(raw))
+    np.ndarray(len(raw), dtype=np.uint8, buffer=buf, offset=_PREFIX.size)[:] = (
+        np.frombuffer(raw, dtype=np.uint8)
+    )
+    for var_name, meta in header["variables"].items():
+        data = cube[var_name]["data"]
+        target = np.ndarray(
+            data.shape,
+            dtype=data.dtype,
+            buffer=buf,
+            offset=_data_start(len(raw)) + meta["offset"],
+        )
+        target[...] = data
+
+    if path is not None:
+        mm.flush()
+
+    return {"name": name, "buffer": owner, "shared": path is None}
+
+
+def attach_cube(name):
+    """
+    Se conecta en solo lectura a un cubo publicado (por nombre del bloque
+    compartido o ruta del fichero). No copia datos: solo lee la cabecera
+    y crea vistas sobre el bloque, así que el coste no depende del tamaño.
+
+    Devuelve un diccionario con:
+    - arrays: variable -> np.ndarray de solo lectura
+    - dims / labels: dimensiones y etiquetas de cada variable
+    - buffer: objeto que mantiene vivo el bloque
+    """
+    if Path(name).is_file():
+        owner = np.memmap(name, dtype=np.uint8, mode="r")
+        buf, shared = owner, False
+    else:
+        owner = shared_memory.SharedMemory(name=name)
+        buf, shared = owner.buf, True
+
+    magic, length = _PREFIX.unpack_from(buf, 0)
+    if magic != MAGIC:
+        raise ValueError(f"{name}: no es un cubo de indicadores")
+    header = json.loads(bytes(buf[_PREFIX.size:_PREFIX.size + length]))
+
+    arrays, dims, labels = {}, {}, {}
+    for var_name, meta in header["variables"].items():
+        arr = np.ndarray(
+            meta["shape"],
+            dtype=np.dtype(meta["dtype"]),
+            buffer=buf,
+            offset=_data_start(length) + meta["offset"],
+        )
+        arr.flags.writeable = False
+        arrays[var_name] = arr
+        dims[var_name] = meta["dims"]
+        labels[var_name] = meta["labels"]
+
+    return {
+        "name": name,
+        "arrays": arrays,
+        "dims": dims,
+        "labels": labels,
+        "buffer": owner,
+        "shared": shared,
+    }
+
+
+def release_cube(handle, unlink=False):
+    """
+    Libera las vistas de un cubo. Quien lo publicó debe llamar con
+    unlink=True al terminar para borrar el bloque compartido.
+    """
+    owner = handle["buffer"]
+    handle.pop("arrays", None)
+    if handle["shared"]:
+        owner.close()
+        if unlink:
+            owner.unlink()
+    else:
+        del owner
+        handle["buffer"] = None
+        if unlink:
+            Path(handle["name"]).unlink(missing_ok=True)
+
+
+def _codes_dtype(n):
+    # Códigos con signo, como los que espera pd.Categorical.from_codes
+    return np.result_type(np.min_scalar_type(-n), np.int8)
+
+
+def cube_frame(attached, var, dropna=True):
+    """
+    DataFrame largo de una variable del cubo, con el formato que esperan
+    las funciones de analysis (una columna por dimensión + valor).
+
+    Las celdas vacías se filtran sobre el array antes de pasar a formato
+    largo. Si no hay celdas vacías (o con dropna=False) la columna de
+    valores es una vista del bloque compartido; si las hay, solo se
+    copian las celdas con dato.
+
+    Las dimensiones de texto son categóricas (códigos de 1–2 bytes sobre
+    las etiquetas del cubo); las numéricas (anio) se materializan como
+    enteros, que es lo que esperan los filtros y operaciones del estudio.
+    Esas columnas son lo único que se copia por proceso.
+    """
+    arr = attached["arrays"][var]
+    dims = attached["dims"][var]
+    labels = attached["labels"][var]
+
+    values = arr.reshape(-1)
+    keep = None
+    if dropna:
+        missing = np.isnan(values)
+        if missing.any():
+            keep = np.flatnonzero(~missing)
+            values = values[keep]
+
+    columns = {}
+    for i, dim in enumerate(dims):
+        n = arr.shape[i]
+        stride = int(np.prod(arr.shape[i + 1:], dtype=np.int64))
+        if keep is None:
+            shape = [1] * arr.ndim
+            shape[i] = n
+            codes = np.broadcast_to(
+                np.arange(n, dtype=_codes_dtype(n)).reshape(shape), arr.shape
+            ).reshape(-1)
+        else:
+            codes = (keep // stride % n).astype(_codes_dtype(n))
+
+        dim_labels = np.asarray(labels[dim])
+        if dim_labels.dtype.kind in "iuf":
+            columns[dim] = dim_labels[codes]
+        else:
+            columns[dim] = pd.Categorical.from_codes(
+                codes,
+                categories=labels[dim],
+            )
+    columns[var] = values
+
+    return pd.DataFrame(columns, copy=False)
+
+
+def publish_normalized(normalized, path=None):
+    """
+    Publica las entradas normalizadas del estudio como cubo compartido.
+    """
+    return publish_cube(build_cube(normalized), path)
+
+
+def attach_normalized(name):
+    """
+    Reconstruye desde un cubo publicado las entradas normalizadas
+    (births, population, fertility) que usa pipeline.select_inputs.
+
+    Los valores son vistas del bloque compartido (salvo las celdas
+    filtradas por estar vacías y los nacimientos, que se pasan a entero);
+    por proceso solo se materializan las columnas de dimensión (véase
+    cube_frame) y los subconjuntos que filtra cada ejecución.
+    """
+    attached = attach_cube(name)
+    normalized = {
+        source: cube_frame(attached, var)
+        for var, (source, _, _) in CUBE_VARIABLES.items()
+    }
+    normalized["births"]["nacimientos"] = normalized["births"]["nacimientos"].astype("int64")
+
+    return normalized, attached
@@ -0,0 +1,155 @@
+import numpy as np
+import pandas as pd
+from scipy.special import gammaln
+
+# Rejilla de β / exposición media para el ajuste por verosimilitud
+_BETA_GRID = np.logspace(-3, 3, 61)
+
+
+def _method_of_moments(births, exposure, prior_mean, group, n_groups):
+    """
+    Estimador de momentos de Marshall (1991) de la varianza entre celdas:
+    v = s² - m / Ē, truncada en 0.
+
+    Devuelve β = m / v por grupo (inf = contracción total).
+    """
+    rate = np.divide(births, exposure, out=np.zeros_like(births), where=exposure > 0)
+    m = prior_mean[group]
+
+    total_exposure = np.bincount(group, weights=exposure, minlength=n_groups)
+    n_cells = np.bincount(group, minlength=n_groups)
+    s2 = np.bincount(group, weights=exposure * (rate - m) ** 2, minlength=n_groups)
+    s2 = s2 / total_exposure
+
+    v = s2 - prior_mean / (total_exposure / n_cells)
+    with np.errstate(divide="ignore"):
+        return np.where(v > 0, prior_mean / v, np.inf)
+
+
+def _marginal_likelihood(births, exposure, prior_mean, group, n_groups):
+    """
+    Maximiza la verosimilitud marginal Poisson–Gamma (binomial negativa)
+    de cada grupo en una rejilla de β, con la media del grupo fija.
+
+    Todas las celdas y todos los valores de la rejilla se evalúan a la vez.
+    """
+    mean_exposure = (
+        np.bincount(group, weights=exposure, minlength=n_groups)
+        / np.bincount(group, minlength=n_groups)
+    )
+    beta = mean_exposure[:, None] * _BETA_GRID[None, :]
+    alpha = prior_mean[:, None] * beta
+
+    a = alpha[group]
+    b = beta[group]
+    y = births[:, None]
+    e = exposure[:, None]
+    loglik = (
+        gammaln(y + a) - gammaln(a)
+        + a * np.log(b / (b + e))
+        + y * np.log(np.where(e > 0, e, 1.0) / (b + e))
+    )
+
+    by_group = np.zeros((n_groups, len(_BETA_GRID)))
+    np.add.at(by_group, group, loglik)
+
+    # Contracción total (β -> inf): celdas Poisson de media m·E.
+    # En ambos casos se omite el término común -log(y!)
+    mu = prior_mean[group] * exposure
+    pooled = births * np.log(np.where(mu > 0, mu, 1.0)) - mu
+    pooled = np.bincount(group, weights=pooled, minlength=n_groups)
+
+    best_beta = beta[np.arange(n_groups), by_group.argmax(axis=1)]
+    return np.where(pooled >= by_group.max(axis=1), np.inf, best_beta)
+
+
+def shrink_rates(
+    df,
+    prior_by=("anio", "grupo_edad", "nacionalidad"),
+    metodo="momentos",
+):
+    """
+    Estimación en áreas pequeñas por Bayes empírico (Poisson–Gamma).
+
+    Cada celda (p. ej. provincia × edad × año × nacionalidad) se contrae
+    hacia el perfil de su grupo prior_by, que es la tasa agregada
+    ponderada por exposición:
+
+        tasa_eb = w · tasa_celda + (1 - w) · tasa_grupo
+        w = E / (E + β)
+
+    β (la precisión de la distribución a priori) se estima para cada grupo
+    a la vez en todas las celdas:
+    - metodo="momentos": estimador de momentos de Marshall
+    - metodo="verosimilitud": máxima verosimilitud marginal
+
+    Parámetros
+    ----------
+    df : DataFrame
+        Debe contener prior_by, poblacion (personas-año) y tasa (por
+        1.000 mujeres). Si trae 'nacimientos' se usan los observados; si
+        no, los implícitos tasa × poblacion. Las celdas sin exposición se
+        dejan sin contraer.
+
+    Devuelve el DataFrame con:
+    - tasa (contraída, por 1.000 mujeres)
+    - tasa_bruta
+    - peso_eb (w)
+    """
+    d = df.copy()
+    prior_by = list(prior_by)
+
+    exposure = d["poblacion"].to_numpy(dtype=float)
+    usable = np.isfinite(exposure) & (exposure > 0) & d["tasa"].notna().to_numpy()
+
+    if "nacimientos" in d.columns:
+        births = d["nacimientos"].to_numpy(dtype=float)
+    else:
+        births = d["tasa"].to_numpy(dtype=float) / 1000 * exposure
+
+    group, _ = pd.factorize(pd.MultiIndex.from_frame(d[prior_by]))
+    codes, group = np.unique(group[usable], return_inverse=True)
+    n_groups = len(codes)
+
+    y = births[usable]
+    e = exposure[usable]
+    prior_mean = (
+        np.bincount(group, weights=y, minlength=n_groups)
+        / np.bincount(group, weights=e, minlength=n_groups)
+    )
+
+    if metodo == "momentos":
+        beta = _method_of_moments(y, e, prior_mean, group, n_groups)
+    elif metodo == "verosimilitud":
+        beta = _marginal_likelihood(y, e, prior_mean, group, n_groups)
+    else:
+        raise ValueError(f"Método de contracción desconocido: {metodo}")
+
+    weight = np.where(np.isinf(beta[group]), 0.0, e / (e + beta[group]))
+    shrunk = weight * (y / e) + (1 - weight) * prior_mean[group]
+
+    d["tasa_bruta"] = d["tasa"]
+    d["peso_eb"] = 1.0
+    d.loc[usable, "tasa"] = shrunk * 1000
+    d.loc[usable, "peso_eb"] = weight
+
+    return d
+
+
+def shrink_fertility_rates(
+    fertility,
+    population,
+    prior_by=("anio", "grupo_edad", "nacionalidad"),
+    metodo="momentos",
+):
+    """
+    Contrae las tasas específicas usando como exposición la población
+    media de build_population_mean_15_49. Devuelve las tasas con el mismo
+    formato de entrada, listas para compute_tfr_from_rates y
+    mean_age_at_childbearing.
+    """
+    keys = [c for c in population.columns if c != "poblacion"]
+    m = fertility.merge(population, on=keys, how="left")
+    shrunk = shrink_rates(m, prior_by=prior_by, metodo=metodo)
+
+    return shrunk.drop(columns="poblacion")
@@ -0,0 +1,145 @@
+import numpy as np
+import pandas as pd
+
+# Parámetro por defecto de cada método
+DEFAULTS = {
+    "media_movil": {"ventana": 3},
+    "exponencial": {"alpha": 0.5},
+    "whittaker": {"lam": 10.0, "orden": 2},
+    # Hodrick–Prescott = Whittaker de orden 2; λ = 6.25 para datos anuales
+    # (Ravn y Uhlig)
+    "hp": {"lam": 6.25, "orden": 2},
+}
+
+
+def _moving_average(values, ventana):
+    """
+    Media móvil centrada. En los extremos y en los huecos se promedian
+    solo los valores disponibles (como rolling(center=True, min_periods=1)).
+    """
+    n, t = values.shape
+    left = ventana // 2
+    right = ventana - 1 - left
+
+    valid = ~np.isnan(values)
+    zeros = np.zeros((n, 1))
+    csum = np.concatenate([zeros, np.cumsum(np.where(valid, values, 0.0), axis=1)], axis=1)
+    ccount = np.concatenate([zeros, np.cumsum(valid, axis=1)], axis=1)
+
+    idx = np.arange(t)
+    lo = np.clip(idx - left, 0, t)
+    hi = np.clip(idx + right + 1, 0, t)
+
+    total = csum[:, hi] - csum[:, lo]
+    count = ccount[:, hi] - ccount[:, lo]
+
+    return np.divide(total, count, out=np.full(values.shape, np.nan), where=count > 0)
+
+
+def _exponential(values, alpha):
+    """
+    Núcleo exponencial simétrico: pesos (1 - alpha)^|k| hacia ambos lados,
+    renormalizados en los extremos y en los huecos.
+    """
+    decay = 1.0 - alpha
+    valid = ~np.isnan(values)
+    x = np.where(valid, values, 0.0)
+    w = valid.astype(float)
+
+    def forward(a):
+        out = np.empty_like(a)
+        acc = np.zeros(a.shape[0])
+        for j in range(a.shape[1]):
+            acc = a[:, j] + decay * acc
+            out[:, j] = acc
+        return out
+
+    num = forward(x) + forward(x[:, ::-1])[:, ::-1] - x
+    den = forward(w) + forward(w[:, ::-1])[:, ::-1] - w
+
+    return np.divide(num, den, out=np.full(values.shape, np.nan), where=den > 0)
+
+
+def _whittaker(values, lam, orden):
+    """
+    Suavizador de Whittaker–Henderson: minimiza
+    Σ w (y - z)² + λ Σ (Δ^orden z)², con w = 0 en los huecos.
+
+    Las series con el mismo patrón de huecos comparten matriz, de modo
+    que se resuelve un sistema por patrón con todas sus series a la vez.
+    """
+    n, t = values.shape
+    out = np.full(values.shape, np.nan)
+    if t <= orden:
+        return values.copy()
+
+    d = np.diff(np.eye(t), n=orden, axis=0)
+    penalty = lam * d.T @ d
+
+    valid = ~np.isnan(values)
+    patterns, inverse = np.unique(valid, axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    for p, pattern in enumerate(patterns):
+        if pattern.sum() <= orden:
+            continue
+        rows = inverse == p
+        y = np.where(valid[rows], values[rows], 0.0)
+        a = np.diag(pattern.astype(float)) + penalty
+        out[rows] = np.linalg.solve(a, y.T).T
+
+    return out
+
+
+def smooth_matrix(values, metodo="media_movil", **params):
+    """
+    Suaviza a la vez todas las filas (series) de una matriz
+    series × tiempo. Los NaN se tratan como huecos.
+
+    Métodos:
+    - media_movil (ventana)
+    - exponencial (alpha)
+    - whittaker (lam, orden)
+    - hp: Hodrick–Prescott (lam)
+    """
+    params = {**DEFAULTS[metodo], **{k: v for k, v in params.items() if v is not None}}
+    values = np.asarray(values, dtype=float)
+
+    if metodo == "media_movil":
+        return _moving_average(values, int(params["ventana"]))
+    if metodo == "exponencial":
+        return _exponential(values, float(params["alpha"]))
+    return _whittaker(values, float(params["lam"]), int(params["orden"]))
+
+
+def smooth_frame(df, value_cols, by=(), time_col="anio", metodo="media_movil", **params):
+    """
+    Suaviza las columnas value_cols de cada serie (by) a lo largo de
+    time_col. Todas las series e indicadores se apilan en una sola matriz
+    y se suavizan en una única operación.
+
+    Si el tiempo es entero, los años ausentes se tratan como huecos.
+
+    Devuelve un DataFrame con las columnas value_cols suavizadas,
+    alineado con el índice de df.
+    """
+    by = list(by)
+    value_cols = list(value_cols)
+    keys = by + [time_col]
+
+    long = df.set_index(keys)[value_cols]
+    long.columns.name = "_indicador"
+    wide = long.stack().unstack(time_col)
+
+    if pd.api.types.is_integer_dtype(wide.columns):
+        wide = wide.reindex(columns=range(wide.columns.min(), wide.columns.max() + 1))
+
+    smoothed = pd.DataFrame(
+        smooth_matrix(wide.to_numpy(dtype=float), metodo, **params),
+        index=wide.index,
+        columns=wide.columns,
+    )
+
+    result = smoothed.stack().unstack("_indicador")
+    result = result.reindex(pd.MultiIndex.from_frame(df[keys]) if by else pd.Index(df[time_col]))
+
+    return pd.DataFrame(result[value_cols].to_numpy(), index=df.index, columns=value_cols)
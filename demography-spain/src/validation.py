@@ -0,0 +1,382 @@
+import pandas as pd
+from pandas.api import types as ptypes
+
+from preprocessing import (
+    compute_mean_annual_population,
+    group_foreigners,
+    parse_snapshot_dates,
+)
+
+# =====================
+# ESQUEMAS DE ENTRADA
+# =====================
+# Tipo esperado de cada columna y claves que deben ser únicas.
+SCHEMAS = {
+    "births_by_nationality": {
+        "tipos": {
+            "anio": "entero",
+            "nacionalidad": "texto",
+            "nacimientos": "entero",
+        },
+        "claves": ["anio", "nacionalidad"],
+    },
+    "women_15_49_by_nationality": {
+        "tipos": {
+            "grupo_edad": "texto",
+            "nacionalidad": "texto",
+            "anio": "texto",
+            "poblacion": "entero",
+        },
+        "claves": ["anio", "grupo_edad", "nacionalidad"],
+    },
+    "fertility_rates_by_age_and_nationality": {
+        "tipos": {
+            "grupo_edad": "texto",
+            "nacionalidad": "texto",
+            "anio": "entero",
+            "tasa": "numerico",
+        },
+        "claves": ["anio", "grupo_edad", "nacionalidad"],
+    },
+    "tfr_by_nationality": {
+        "tipos": {
+            "anio": "entero",
+            "nacionalidad": "texto",
+            "tfr": "numerico",
+        },
+        "claves": ["anio", "nacionalidad"],
+    },
+}
+
+# Rango admisible (mínimo, máximo) de las columnas numéricas
+DOMAINS = {
+    "anio": (1900, 2100),
+    "nacimientos": (0, None),
+    "poblacion": (0, None),
+    "tasa": (0, 1000),
+    "tfr": (0, None),
+}
+
+AGE_GROUP_PATTERN = r"^(De \d{1,3} a \d{1,3}|\d{1,3} y mas|\d{1,3}) anios$"
+
+_TYPE_CHECKS = {
+    "entero": ptypes.is_integer_dtype,
+    "numerico": ptypes.is_numeric_dtype,
+    "texto": lambda s: ptypes.is_string_dtype(s) or ptypes.is_object_dtype(s),
+}
+
+# Comprobaciones de check_schema que impiden las demás
+STRUCTURAL_CHECKS = ("columnas", "tipos", "nulos")
+
+REPORT_COLUMNS = [
+    "dataset",
+    "comprobacion",
+    "severidad",
+    "incidencias",
+    "detalle",
+]
+
+
+def _result(dataset, check, n_issues, detail="", severity="error"):
+    """
+    Fila del informe. Sin incidencias la severidad pasa a 'ok'.
+    """
+    return {
+        "dataset": dataset,
+        "comprobacion": check,
+        "severidad": severity if n_issues else "ok",
+        "incidencias": int(n_issues),
+        "detalle": detail if n_issues else "",
+    }
+
+
+def _sample(values, n=5):
+    values = list(values)
+    suffix = ", ..." if len(values) > n else ""
+    return ", ".join(str(v) for v in values[:n]) + suffix
+
+
+def _snapshot_years(df):
+    """
+    Año de cada fila: entero directo o extraído de la fecha de corte.
+    """
+    if ptypes.is_numeric_dtype(df["anio"]):
+        return df["anio"]
+    return parse_snapshot_dates(df["anio"]).dt.year
+
+
+def check_schema(df, name):
+    """
+    Columnas, tipos, nulos, dominios de valores y claves duplicadas.
+    """
+    schema = SCHEMAS[name]
+    rows = []
+
+    missing = [c for c in schema["tipos"] if c not in df.columns]
+    rows.append(
+        _result(name, "columnas", len(missing), f"faltan: {_sample(missing)}")
+    )
+    if missing:
+        return rows
+
+    wrong_types = [
+        f"{col} ({df[col].dtype}, se esperaba {kind})"
+        for col, kind in schema["tipos"].items()
+        if not _TYPE_CHECKS[kind](df[col])
+    ]
+    rows.append(
+        _result(name, "tipos", len(wrong_types), _sample(wrong_types))
+    )
+
+    nulls = df[list(schema["tipos"])].isna().sum()
+    nulls = nulls[nulls > 0]
+    rows.append(
+        _result(
+            name,
+            "nulos",
+            nulls.sum(),
+            _sample(f"{c}: {n}" for c, n in nulls.items()),
+        )
+    )
+
+    # Dominios: se fuerza a numérico para poder comparar aunque el tipo
+    # sea incorrecto (lo que no convierte ya cuenta como nulo arriba)
+    for col, (low, high) in DOMAINS.items():
+        if col not in df.columns or schema["tipos"][col] == "texto":
+            continue
+        values = pd.to_numeric(df[col], errors="coerce")
+        bad = pd.Series(False, index=df.index)
+        if low is not None:
+            bad |= values < low
+        if high is not None:
+            bad |= values > high
+        rows.append(
+            _result(
+                name,
+                f"dominio_{col}",
+                bad.sum(),
+                f"fuera de [{low}, {high}]: {_sample(values[bad].unique())}",
+            )
+        )
+
+    if "grupo_edad" in df.columns:
+        bad = ~df["grupo_edad"].astype(str).str.match(AGE_GROUP_PATTERN)
+        rows.append(
+            _result(
+                name,
+                "dominio_grupo_edad",
+                bad.sum(),
+                f"etiquetas no reconocidas: {_sample(df.loc[bad, 'grupo_edad'].unique())}",
+            )
+        )
+
+    dup = df.duplicated(schema["claves"], keep=False)
+    rows.append(
+        _result(
+            name,
+            "claves_duplicadas",
+            dup.sum(),
+            f"claves {schema['claves']} repetidas",
+        )
+    )
+
+    return rows
+
+
+def check_year_coverage(df, name, by=("nacionalidad",)):
+    """
+    Detecta años ausentes dentro del rango observado de cada serie.
+    """
+    years = _snapshot_years(df)
+    coverage = (
+        df.assign(_anio=years)
+        .dropna(subset=["_anio"])
+        .groupby(list(by))["_anio"]
+        .agg(["min", "max", "nunique"])
+    )
+    coverage["huecos"] = coverage["max"] - coverage["min"] + 1 - coverage["nunique"]
+    with_gaps = coverage[coverage["huecos"] > 0]
+
+    return [
+        _result(
+            name,
+            "cobertura_anual",
+            with_gaps["huecos"].sum(),
+            f"series con años ausentes: {_sample(with_gaps.index)}",
+            severity="aviso",
+        )
+    ]
+
+
+def check_snapshots(women, name="women_15_49_by_nationality"):
+    """
+    Fechas de corte de la población: que se puedan leer y que cada
+    año tenga los cortes de 1 de enero y 1 de julio.
+    """
+    # Máscaras posicionales: el índice de entrada puede repetir etiquetas
+    dates = pd.DatetimeIndex(parse_snapshot_dates(women["anio"]))
+    unparsed = dates.isna()
+
+    rows = [
+        _result(
+            name,
+            "fechas_corte",
+            unparsed.sum(),
+            f"fechas no reconocidas: {_sample(pd.unique(women['anio'].to_numpy()[unparsed]))}",
+        )
+    ]
+
+    parsed = dates[~unparsed]
+    d = pd.DataFrame(
+        {
+            "grupo_edad": women["grupo_edad"].to_numpy()[~unparsed],
+            "nacionalidad": women["nacionalidad"].to_numpy()[~unparsed],
+            "anio": parsed.year,
+            "enero": (parsed.month == 1) & (parsed.day == 1),
+            "julio": (parsed.month == 7) & (parsed.day == 1),
+        }
+    )
+    present = d.groupby(["anio", "grupo_edad", "nacionalidad"])[
+        ["enero", "julio"]
+    ].any()
+    incomplete = present[~(present["enero"] & present["julio"])]
+
+    rows.append(
+        _result(
+            name,
+            "cortes_enero_julio",
+            len(incomplete),
+            f"series-año sin ambos cortes: {_sample(incomplete.index)}",
+            severity="aviso",
+        )
+    )
+
+    return rows
+
+
+def births_coherence(births, women, fertility, population=None):
+    """
+    Compara los nacimientos observados con los implícitos en las tasas:
+    Σ tasa_edad / 1.000 × personas-año_edad, por año y nacionalidad.
+
+    population permite reutilizar una exposición ya calculada (anio,
+    grupo_edad, nacionalidad agrupada, poblacion) en lugar de volver a
+    integrarla a partir de women; debe cubrir todas las edades.
+
+    Devuelve un DataFrame con:
+    - anio
+    - nacionalidad
+    - nacimientos
+    - nacimientos_esperados
+    - desviacion_relativa
+    """
+    births = group_foreigners(births)
+    fertility = group_foreigners(fertility)
+
+    # Población media anual (personas-año)
+    if population is None:
+        pop = compute_mean_annual_population(group_foreigners(women))
+    else:
+        pop = population
+
+    m = pop.merge(fertility, on=["anio", "grupo_edad", "nacionalidad"])
+    m["nacimientos_esperados"] = m["poblacion"] * m["tasa"] / 1000
+
+    expected = m.groupby(["anio", "nacionalidad"], as_index=False)[
+        "nacimientos_esperados"
+    ].sum()
+    observed = births.groupby(["anio", "nacionalidad"], as_index=False)[
+        "nacimientos"
+    ].sum()
+
+    df = observed.merge(expected, on=["anio", "nacionalidad"], how="inner")
+    df["desviacion_relativa"] = (
+        df["nacimientos"] / df["nacimientos_esperados"] - 1
+    )
+
+    return df
+
+
+def check_births_coherence(births, women, fertility, tolerance=0.05, population=None):
+    coherence = births_coherence(births, women, fertility, population)
+    off = coherence[coherence["desviacion_relativa"].abs() > tolerance]
+
+    return [
+        _result(
+            "coherencia_nacimientos",
+            f"nacimientos_vs_asfr_x_poblacion (tolerancia {tolerance:.0%})",
+            len(off),
+            _sample(
+                f"{r.anio}/{r.nacionalidad}: {r.desviacion_relativa:+.1%}"
+                for r in off.itertuples()
+            ),
+            severity="aviso",
+        )
+    ]
+
+
+def structurally_valid(rows):
+    """
+    False si alguna fila tiene error de columnas, tipos o nulos: con esos
+    errores las comprobaciones entre ficheros no se pueden calcular.
+    """
+    return not any(
+        r["comprobacion"] in STRUCTURAL_CHECKS and r["severidad"] == "error"
+        for r in rows
+    )
+
+
+def validate_dataset(df, name):
+    """
+    Comprobaciones de un único fichero: esquema y cobertura anual (esta
+    solo si el esquema es estructuralmente válido). Devuelve las filas
+    del informe.
+    """
+    rows = check_schema(df, name)
+    if not structurally_valid(rows):
+        return rows
+
+    by = ["nacionalidad"]
+    if "grupo_edad" in df.columns:
+        by.append("grupo_edad")
+
+    return rows + check_year_coverage(df, name, by)
+
+
+def validate_inputs(births, women, fertility, tfr=None, tolerance=0.05):
+    """
+    Ejecuta todas las comprobaciones sobre los datos tal y como los
+    devuelven los loaders de data_ingestion (antes de agrupar
+    nacionalidades) y devuelve un informe estructurado.
+
+    Devuelve un DataFrame con:
+    - dataset
+    - comprobacion
+    - severidad ('ok', 'aviso', 'error')
+    - incidencias
+    - detalle
+    """
+    inputs = {
+        "births_by_nationality": births,
+        "women_15_49_by_nationality": women,
+        "fertility_rates_by_age_and_nationality": fertility,
+    }
+    if tfr is not None:
+        inputs["tfr_by_nationality"] = tfr
+
+    rows = []
+    schema_ok = True
+    for name, df in inputs.items():
+        dataset_rows = validate_dataset(df, name)
+        rows += dataset_rows
+        schema_ok &= structurally_valid(dataset_rows)
+
+    if schema_ok:
+        rows += check_snapshots(women)
+        rows += check_births_coherence(births, women, fertility, tolerance)
+
+    return pd.DataFrame(rows, columns=REPORT_COLUMNS)
+
+
+def has_errors(report):
+    return bool((report["severidad"] == "error").any())
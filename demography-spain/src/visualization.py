@@ -60,8 +60,7 @@ plt.title("Ratio de intensidad reproductiva")
 plt.show()
 
 
-fertility = load_fertility_rates().rename(columns={"Nacionalidad": "nacionalidad"})
-fertility = group_foreigners(fertility)
+fertility = group_foreigners(load_fertility_rates())
 fertility = fertility[(fertility["anio"] >= 2002) & (fertility["anio"] <= 2024)]
 
 latest_year = fertility["anio"].max()
@@ -0,0 +1,266 @@
+import queue
+import time
+from pathlib import Path
+import pandas as pd
+
+from data_ingestion import RAW_DATA_DIR
+from validation import (
+    REPORT_COLUMNS,
+    check_births_coherence,
+    check_snapshots,
+    has_errors,
+    structurally_valid,
+    validate_dataset,
+    validate_inputs,
+)
+from pipeline import DEFAULT_PARAMS, INPUT_FILES, data_sources, run_stages
+
+# Entradas que intervienen en la coherencia nacimientos / tasas × exposición
+COHERENCE_INPUTS = {"births", "women", "fertility"}
+
+
+def _input_of(path):
+    """
+    Entrada a la que pertenece un fichero: el fichero por defecto o una
+    partición dentro del subdirectorio con su nombre. None si ninguna.
+    """
+    path = Path(path)
+    for name, (filename, _) in INPUT_FILES.items():
+        if path.name == filename or (
+            path.suffix == ".csv" and path.parent.name == Path(filename).stem
+        ):
+            return name
+    return None
+
+
+def _watchdog_events(directory, events):
+    """
+    Observador de eventos del sistema de ficheros (watchdog). Devuelve
+    None si watchdog no está instalado.
+    """
+    try:
+        from watchdog.events import FileSystemEventHandler
+        from watchdog.observers import Observer
+    except ImportError:
+        return None
+
+    # Solo escrituras: watchdog también notifica aperturas y cierres,
+    # y releer un fichero dispararía la siguiente recarga
+    class Handler(FileSystemEventHandler):
+        def _queue(self, event, path):
+            name = None if event.is_directory else _input_of(path)
+            if name:
+                events.put(name)
+
+        def on_modified(self, event):
+            self._queue(event, event.src_path)
+
+        def on_created(self, event):
+            self._queue(event, event.src_path)
+
+        def on_moved(self, event):
+            self._queue(event, event.dest_path)
+
+    observer = Observer()
+    observer.schedule(Handler(), str(directory), recursive=True)
+    observer.start()
+    return observer
+
+
+def _mtimes(sources):
+    """
+    Última modificación de cada entrada. En un directorio de
+    particiones cuenta también el propio directorio (altas y bajas).
+    """
+    mtimes = {}
+    for name, source in sources.items():
+        paths = [source] + (sorted(source.glob("*.csv")) if source.is_dir() else [])
+        stamps = [p.stat().st_mtime_ns for p in paths if p.exists()]
+        if stamps:
+            mtimes[name] = max(stamps)
+    return mtimes
+
+
+def _poll_events(sources, events, processed, interval):
+    """
+    Alternativa sin watchdog: compara las fechas de modificación con las
+    de la última lectura.
+    """
+    time.sleep(interval)
+    current = _mtimes(sources)
+    for name in sources:
+        if processed.get(name) != current.get(name):
+            events.put(name)
+
+
+def _drain(events, debounce):
+    """
+    Recoge los ficheros cambiados, esperando a que dejen de llegar
+    eventos (los editores suelen escribir en varios pasos).
+    """
+    changed = set()
+    while True:
+        try:
+            changed.add(events.get(timeout=debounce))
+        except queue.Empty:
+            return changed
+
+
+def _validate_files(updated):
+    """
+    Esquema y cobertura de cada fichero releído y, si cambia la
+    población, sus fechas de corte. Se ejecuta antes de recalcular.
+    """
+    rows = []
+    for name, df in updated.items():
+        dataset_rows = validate_dataset(df, Path(INPUT_FILES[name][0]).stem)
+        rows += dataset_rows
+        if name == "women" and structurally_valid(dataset_rows):
+            rows += check_snapshots(df)
+
+    return pd.DataFrame(rows, columns=REPORT_COLUMNS)
+
+
+def _check_coherence(cache, updated, params):
+    """
+    Coherencia nacimientos / tasas × exposición, solo si ha cambiado
+    alguna de esas entradas. Da el mismo resultado que validate_inputs:
+    reutiliza la exposición ya recalculada por la etapa 'population'
+    solo si cubre todas las edades y todos los años de nacimientos y
+    tasas; con un rango de edades o una ventana más estrecha la vuelve
+    a integrar.
+    """
+    if not COHERENCE_INPUTS.intersection(updated):
+        return pd.DataFrame(columns=REPORT_COLUMNS)
+
+    births, fertility = cache["raw_births"], cache["raw_fertility"]
+    years = pd.concat([births["anio"], fertility["anio"]])
+    complete = (
+        params["edad_min"] is None
+        and params["edad_max"] is None
+        and params["anio_inicio"] <= years.min()
+        and params["anio_fin"] >= years.max()
+    )
+    rows = check_births_coherence(
+        births,
+        cache["raw_women"],
+        fertility,
+        population=cache["population"] if complete else None,
+    )
+
+    return pd.DataFrame(rows, columns=REPORT_COLUMNS)
+
+
+def watch(params=None, directory=None, interval=1.0, debounce=0.3, on_update=None):
+    """
+    Modo vigilancia: calcula el estudio una vez y, cada vez que cambia
+    un fichero de entrada, vuelve a leer solo ese fichero y recalcula
+    solo las etapas que dependen de él (véase pipeline.STAGES). El resto
+    de resultados se mantiene en memoria.
+
+    Usa eventos del sistema de ficheros si watchdog está instalado y, si
+    no, consulta las fechas de modificación cada 'interval' segundos.
+
+    La carga inicial se valida entera (validate_inputs). Después, cada
+    cambio se valida de forma incremental: esquema del fichero releído
+    antes de recalcular y coherencia entre ficheros después. Si hay
+    errores, o si falla la lectura o el recálculo, se descarta el cambio
+    y se conservan los resultados previos; si aún no los hay, se esperan
+    correcciones y se vuelven a validar todas las entradas.
+
+    on_update(cache, etapas) se llama tras cada cálculo. No se muestran
+    gráficas. Termina con Ctrl+C y devuelve el último cache (None si
+    nunca se superó la validación).
+    """
+    params = {**DEFAULT_PARAMS, **(params or {})}
+    directory = Path(directory or RAW_DATA_DIR)
+    sources = data_sources(directory)
+
+    # Última versión legible de cada entrada y resultados vigentes
+    latest = {}
+    cache = None
+
+    def process(changed, label):
+        nonlocal cache
+        start = time.perf_counter()
+        keep = (
+            "se mantienen los resultados previos"
+            if cache is not None
+            else "se esperan correcciones"
+        )
+        try:
+            updated = {}
+            for name in sorted(changed):
+                updated[name] = latest[name] = INPUT_FILES[name][1](sources[name])
+
+            if cache is None:
+                missing = [name for name in INPUT_FILES if name not in latest]
+                if missing:
+                    raise FileNotFoundError(f"sin leer: {', '.join(missing)}")
+                updated = dict(latest)
+                report = validate_inputs(**updated)
+            else:
+                report = _validate_files(updated)
+            if has_errors(report):
+                print(f"{label}: no supera la validación; {keep}")
+                print(report[report["severidad"] == "error"].to_string(index=False))
+                return
+
+            raw = {f"raw_{name}": df for name, df in updated.items()}
+            candidate = {**(cache or {}), **raw}
+            stages = run_stages(candidate, params, changed=raw)
+            if cache is not None:
+                report = pd.concat(
+                    [report, _check_coherence(candidate, updated, params)],
+                    ignore_index=True,
+                )
+        except Exception as e:
+            print(f"{label}: {type(e).__name__}: {e}; {keep}")
+            return
+
+        cache = candidate
+        warnings = report[report["severidad"] == "aviso"]
+        if len(warnings):
+            print(warnings.to_string(index=False))
+        print(
+            f"{label}: {len(stages)} etapas calculadas "
+            f"({', '.join(stages)}) en {time.perf_counter() - start:.3f} s"
+        )
+        if on_update:
+            on_update(cache, stages)
+
+    # Fecha de modificación de cada entrada en su última lectura
+    processed = _mtimes(sources)
+    process(INPUT_FILES, "carga inicial")
+
+    events = queue.Queue()
+    observer = _watchdog_events(directory, events)
+    print(
+        f"Vigilando {directory} "
+        f"({'watchdog' if observer else f'sondeo cada {interval} s'}); Ctrl+C para salir"
+    )
+
+    try:
+        while True:
+            if observer is None:
+                _poll_events(sources, events, processed, interval)
+            try:
+                changed = {events.get(timeout=interval)} if observer else set()
+            except queue.Empty:
+                continue
+            changed |= _drain(events, debounce)
+            # Descarta eventos sin cambio real desde la última lectura
+            current = _mtimes(sources)
+            changed = {n for n in changed if current.get(n) != processed.get(n)}
+            if not changed:
+                continue
+            processed.update({n: current.get(n) for n in changed})
+            process(changed, ", ".join(sorted(changed)))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if observer is not None:
+            observer.stop()
+            observer.join()
+
+    return cache